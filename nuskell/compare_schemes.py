@@ -18,16 +18,22 @@ from . import __version__
 from .objects import NuskellDomain, NuskellComplex, show_memory
 from .ioutils import get_strands
 from .crnutils import parse_crn_string 
+from .dsdanalysis import polymerization_risk
 from .dsdcompiler import translate, get_builtin_schemes, NuskellExit
 from .framework import (get_peppercorn_args, 
                         set_handle_verbosity,
                         enumerate_solution,
                         enumerate_modules,
+                        derive_modules,
+                        EnumerationTimeout,
                         interpret_species,
                         get_verification_crn,
                         get_verification_modules,
                         verify,
                         verify_modules,
+                        verify_portfolio,
+                        VerificationCache,
+                        FormalCRN,
                         assign_species)
 
 def process_input(crns, schemes):
@@ -59,12 +65,41 @@ def compare_schemes(crns, schemes, args = None):
         args (argparse(), optional): An object that contains arguments for peppercorn.
         verify (list, optional): An list of correctness notions.
         verify_timeout (int, optional): Timeout of verification [seconds].
+        verify_memory (int, optional): Memory limit of verification [MiB].
+        verify_portfolio (str, optional): Run verification methods concurrently.
+        no_verify_cache (bool, optional): Do not use the verification cache.
+        verify_stats (bool, optional): Add a column with the verification
+            statistics of every method.
 
     Returns:
         A dataframe.
     """
+    # Options which may be missing in a Namespace built by the caller.
+    auto_reject_remote = getattr(args, 'auto_reject_remote', False)
+    derive = getattr(args, 'derive_modules', False)
+    verify_memory = getattr(args, 'verify_memory', 0)
+    verify_workers = getattr(args, 'verify_workers', 0)
+    verify_samples = getattr(args, 'verify_samples', 1000)
+    verify_reuse_modules = getattr(args, 'verify_reuse_modules', False)
+    verify_hints = getattr(args, 'verify_hints', False)
+    verify_reduce = getattr(args, 'verify_reduce', False)
+    verify_decompose = getattr(args, 'verify_decompose', False)
+    verify_prefilter = getattr(args, 'verify_prefilter', False)
+    portfolio = getattr(args, 'verify_portfolio', None)
+    verify_stats = getattr(args, 'verify_stats', False)
+
     plotdata = [['scheme', 'CRN', 'enumerated', '# nuc', '# rxns'
                 ] + args.verify + ['equivalent']]
+    if verify_stats:
+        plotdata[0].append('statistics')
+    # The number of verification columns.
+    ncols = len(plotdata[0]) - 5
+    if getattr(args, 'no_verify_cache', False):
+        cache = None
+    else:
+        cache = VerificationCache(getattr(args, 'verify_cache_dir', None))
+    # Every input CRN is prepared for verification only once for all schemes.
+    prepared = dict()
 
     for ts in schemes:
         for (name, input_crn) in crns:
@@ -84,7 +119,7 @@ def compare_schemes(crns, schemes, args = None):
                 # Garbage collection to clear singleton objects.
                 gc.collect()
                 # Return empty results
-                current.extend([None, None, None] + [None] * (len(args.verify)+1))
+                current.extend([None, None, None] + [None] * ncols)
                 plotdata.append(current)
                 continue
             
@@ -99,10 +134,25 @@ def compare_schemes(crns, schemes, args = None):
             log.info(f"Enumerating CRN {name=} using translation scheme {ts=}.")
             assert args.reject_remote is False
             semantics = ['d'] if args.enum_detailed else ['c']
+            if auto_reject_remote and polymerization_risk(solution):
+                # Skip the (likely) doomed enumeration with default semantics.
+                log.warning(f"Using reject-remote enumeration semantics up front ({name=}, {ts=}).")
+                args.reject_remote = True
+                semantics.append('rr')
             complexes = dict()
             reactions = set()
+            truncated = False
             try: # ENUMERATE
-                complexes, reactions = enumerate_solution(solution, args)
+                if args.reject_remote:
+                    polymerized = True
+                else:
+                    polymerized = False
+                    complexes, reactions = enumerate_solution(solution, args)
+            except EnumerationTimeout as e:
+                log.warning(f"{e} Recording truncated network ({name=}, {ts=}).")
+                complexes, reactions = e.complexes, e.reactions
+                semantics.append('timeout')
+                truncated = True
             except PolymerizationError as e:
                 complexes.clear()
                 reactions.clear()
@@ -112,8 +162,16 @@ def compare_schemes(crns, schemes, args = None):
                 log.warning(f"Changing enumeration parameters to reject-remote ({name=}, {ts=}).")
                 args.reject_remote = True
                 semantics.append('rr')
+                polymerized = True
+
+            if polymerized:
                 try:
                     complexes, reactions = enumerate_solution(solution, args)
+                except EnumerationTimeout as e:
+                    log.warning(f"{e} Recording truncated network ({name=}, {ts=}).")
+                    complexes, reactions = e.complexes, e.reactions
+                    semantics.append('timeout')
+                    truncated = True
                 except PolymerizationError as e:
                     log.error(e)
                     log.error(f"Exiting enumeration for {name} and {ts}.")
@@ -127,7 +185,7 @@ def compare_schemes(crns, schemes, args = None):
                     assert list(show_memory()) == []
                     # Append results
                     args.reject_remote = False
-                    current.extend([None, None, None] + [None] * (len(args.verify)+1))
+                    current.extend([None, None, None] + [None] * ncols)
                     plotdata.append(current)
                     continue
 
@@ -140,10 +198,27 @@ def compare_schemes(crns, schemes, args = None):
                 complexes.clear()
                 gc.collect()
                 assert list(show_memory()) == []
-                current.extend([None, None, None] + [None] * (len(args.verify)+1))
+                current.extend([None, None, None] + [None] * ncols)
                 plotdata.append(current)
                 continue
 
+            if truncated:
+                # Record size of the truncated network, no verification results.
+                args.reject_remote = False
+                current.append(':'.join(semantics))
+                current.append(sum(sum(map(lambda d: d.length, s)) for s in get_strands(complexes)))
+                current.append(len(reactions))
+                current.extend([None] * ncols)
+                plotdata.append(current)
+                solution.clear()
+                [m.clear() for m in modules]
+                del fuels, wastes, intermediates, signals
+                complexes.clear()
+                reactions.clear()
+                gc.collect()
+                assert list(show_memory()) == []
+                continue
+
             interpretation, complexes, reactions = interpret_species(complexes, 
                                                                      reactions,
                                                                      fsc.keys(),
@@ -151,11 +226,17 @@ def compare_schemes(crns, schemes, args = None):
             fuels, wastes, intermediates, signals = assign_species(complexes)
 
             if args.modular:
-                mcomplexes, mreactions = enumerate_modules(modules, 
-                                                           interpretation,
-                                                           complexes,
-                                                           reactions,
-                                                           args)
+                if derive:
+                    mcomplexes, mreactions = derive_modules(modules,
+                                                            interpretation,
+                                                            complexes,
+                                                            reactions)
+                else:
+                    mcomplexes, mreactions = enumerate_modules(modules, 
+                                                               interpretation,
+                                                               complexes,
+                                                               reactions,
+                                                               args)
             # Restore to default, just in case.
             args.reject_remote = False
 
@@ -167,24 +248,67 @@ def compare_schemes(crns, schemes, args = None):
  
             # VERIFY
             formals = set(fsc.keys())
+            if name not in prepared:
+                prepared[name] = (FormalCRN(fcrn, formals), 
+                                  [FormalCRN([m], formals) for m in fcrn])
+            formal, fmodules = prepared[name]
             icrn, fuels, wastes = get_verification_crn(reactions, fuels, signals)
             if args.modular:
-                fcrns, icrns = get_verification_modules(fcrn, mreactions, fuels, wastes)
+                _, icrns = get_verification_modules(fcrn, mreactions, fuels, wastes)
+                fcrns = fmodules
 
-            equiv = False
+            verdicts, stats = dict(), dict()
+            if portfolio:
+                for meth, v, _, st in verify_portfolio(formal, icrn, formals, args.verify,
+                                          interpretation = interpretation,
+                                          fcrns = fcrns if args.modular else None, 
+                                          icrns = icrns if args.modular else None, 
+                                          timeout = args.verify_timeout,
+                                          memory = verify_memory,
+                                          cache = cache,
+                                          reduce = verify_reduce,
+                                          prefilter = verify_prefilter,
+                                          samples = verify_samples,
+                                          first = portfolio == 'first',
+                                          catch = (NotImplementedError,),
+                                          instrument = True):
+                    verdicts[meth] = '-' if isinstance(v, NotImplementedError) else v
+                    stats[meth] = str(st)
             for meth in args.verify:
-                if 'modular-' in meth and len(fcrns) > 1:
+                if portfolio:
+                    # Methods stopped after a conclusive result have no verdict.
+                    verdicts.setdefault(meth, '-')
+                elif 'modular-' in meth and len(fcrns) > 1:
                     try:
-                        v, i = verify_modules(fcrns, icrns, formals, meth[8:], 
+                        verdicts[meth], _, st = verify_modules(fcrns, icrns, formals, meth[8:], 
                                           interpretation = interpretation, 
-                                          timeout = args.verify_timeout)
+                                          timeout = args.verify_timeout,
+                                          memory = verify_memory,
+                                          cache = cache,
+                                          workers = verify_workers,
+                                          reuse = verify_reuse_modules,
+                                          instrument = True)
+                        stats[meth] = str(st)
                     except NotImplementedError:
-                        v = i = '-'
+                        verdicts[meth] = '-'
                 else:
-                    if 'modular' in meth: meth = meth[8:]
-                    v, i = verify(fcrn, icrn, formals, meth, 
+                    verdicts[meth], _, st = verify(formal, icrn, formals, 
+                                  meth[8:] if 'modular' in meth else meth, 
                                   interpretation = interpretation, 
-                                  timeout = args.verify_timeout)
+                                  timeout = args.verify_timeout,
+                                  memory = verify_memory,
+                                  cache = cache,
+                                  reduce = verify_reduce,
+                                  decompose = verify_decompose,
+                                  prefilter = verify_prefilter,
+                                  samples = verify_samples,
+                                  hints = verify_hints,
+                                  instrument = True)
+                    stats[meth] = str(st)
+
+            equiv = False
+            for meth in args.verify:
+                v = verdicts[meth]
                 current.append(v)
                 if equiv is True:
                     pass
@@ -193,6 +317,8 @@ def compare_schemes(crns, schemes, args = None):
                 elif v is None:
                     equiv = 'timeout'
             current.append(equiv)
+            if verify_stats:
+                current.append(stats)
             plotdata.append(current)
 
             solution.clear()
@@ -207,6 +333,8 @@ def compare_schemes(crns, schemes, args = None):
             gc.collect()
             assert list(show_memory()) == []
             log.info(f"Done with CRN {name=} using translation scheme {ts=}. Moving on ...")
+    if cache is not None and cache.hits:
+        log.info(f"Verification cache: {cache.hits} hits, {cache.misses} misses.")
     return plotdata
 
 def get_nuskellCMP_args(parser):
@@ -238,16 +366,80 @@ def get_nuskellCMP_args(parser):
                        'modular-crn-bisimulation-bf', 
                        'pathway-decomposition', 
                        'compositional-hybrid',
-                       'integrated-hybrid'), metavar = '<str>', 
+                       'integrated-hybrid',
+                       'random-walk'), metavar = '<str>', 
             help="""Specify verification methods. Choose one or more from:
             crn-bisimulation, crn-bisimulation-ls, crn-bisimulation-bf, 
             modular-crn-bisimulation, 
             modular-crn-bisimulation-ls, modular-crn-bisimulation-bf, 
-            pathway-decomposition, integrated-hybrid, compositional-hybrid.""")
+            pathway-decomposition, integrated-hybrid, compositional-hybrid,
+            random-walk. The random-walk method only searches for
+            counterexamples, it reports False or no result.""")
     out.add_argument("--modular", action = 'store_true',
             help=argparse.SUPPRESS)
+    out.add_argument("--auto-reject-remote", action = 'store_true',
+            help="""Analyze every compiled system for complexes that may bind
+            into unbounded polymers, and use --reject-remote enumeration
+            semantics up front if any are found.""")
+    out.add_argument("--derive-modules", action = 'store_true',
+            help="""Derive the reaction networks of individual modules from the
+            enumerated network of the full system, instead of enumerating
+            every module separately.""")
     out.add_argument("--verify-timeout", type = int, default = 30, metavar = '<int>',
             help="Specify time in seconds to wait for verification to complete.")
+    out.add_argument("--verify-memory", type = int, default = 0, metavar = '<int>',
+            help="""Specify a memory limit in MiB for verification. Verification
+            without a result within the limit is treated like a timeout.
+            Defaults to 0, i.e. no limit.""")
+    out.add_argument("--verify-workers", type = int, default = 0, metavar = '<int>',
+            help="""Verify every module of modular-crn-bisimulation methods in
+            a separate process, using at most this many processes at the same
+            time. Defaults to 0, i.e. all modules are verified in one process
+            (with --verify-reuse-modules: one process for every CPU).""")
+    out.add_argument("--verify-samples", type = int, default = 1000, metavar = '<int>',
+            help="""Specify the number of random trajectories of the
+            implementation CRN sampled by the random-walk method. Defaults to
+            1000.""")
+    out.add_argument("--verify-reuse-modules", action = 'store_true',
+            help="""Verify every module of modular-crn-bisimulation methods in
+            a separate process, and verify modules which are identical up to
+            a renaming of species only once. Results of modules are stored in
+            the verification cache.""")
+    out.add_argument("--verify-hints", action = 'store_true',
+            help="""Interpret intermediates which are only produced by a
+            reversible reaction of interpreted species (e.g. a signal bound
+            to a gate) and try crn-bisimulation with these hints first. The
+            original partial interpretation is used if that fails.""")
+    out.add_argument("--verify-stats", action = 'store_true',
+            help="""Add a column with the verification statistics (runtime,
+            implementation CRN size, search counters) of every method.""")
+    out.add_argument("--verify-reduce", action = 'store_true',
+            help="""Merge linear chains of intermediates and collapse
+            duplicate intermediates of the implementation CRN before
+            verification with pathway-decomposition.""")
+    out.add_argument("--verify-decompose", action = 'store_true',
+            help="""Verify the species-disjoint components of the formal CRN
+            separately (in parallel) with crn-bisimulation or
+            pathway-decomposition, if the implementation CRN can be projected
+            onto them. Not used with --verify-portfolio.""")
+    out.add_argument("--verify-prefilter", action = 'store_true',
+            help="""Reject the implementation CRN without verification if it
+            fails a cheap necessary condition for crn-bisimulation or
+            pathway-decomposition: every formal reaction must be achievable,
+            and for crn-bisimulation, interpreted reactions must be formal or
+            trivial and formal conservation laws must hold.""")
+    out.add_argument("--no-verify-cache", action = 'store_true',
+            help="""Do not look up or store verification results in the
+            persistent verification cache.""")
+    out.add_argument("--verify-cache-dir", default = None, metavar = '<str>',
+            help="""Specify the directory of the verification cache.
+            Defaults to $XDG_CACHE_HOME/nuskell/verification (or
+            ~/.cache/nuskell/verification).""")
+    out.add_argument("--verify-portfolio", nargs = '?', const = 'all', default = None,
+            choices = ('all', 'first'), metavar = '<str>',
+            help="""Run all verification methods concurrently in separate
+            processes. Use 'first' to stop the remaining methods after the
+            first conclusive result, their columns are reported as '-'.""")
     return parser
 
 def parse_args(args):
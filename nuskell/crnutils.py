@@ -65,6 +65,79 @@ def genCRN(crn, reversible = True, rates = True, interpretation = None):
                 rate = ' [kf = {:g}, kr = {:g}]'.format(rxn.k_rev, rxn.k_fwd) if rates else ''
                 yield '{} <=> {}{}'.format(' + '.join(P), ' + '.join(R), rate)
 
+class VerificationCRN:
+    """ Single-pass construction of the CRN used for verification.
+
+    Reactions are added one at a time, e.g. while they are enumerated. Fuel
+    species are removed, duplicate reactions are skipped, and the non-waste
+    species are updated through an index of reactions per species. The
+    definition of waste species follows crnverifier.utils.assign_crn_species,
+    but reversible reactions are split into two irreversible reactions. Waste
+    species are only known after the last reaction has been added, they are
+    removed (together with trivial and duplicate reactions) in :meth:`crn`.
+
+    Args:
+        fuels (set[str]): The names of fuel species.
+        signals (set[str]): The names of signal species.
+    """
+    def __init__(self, fuels, signals):
+        self.fuels = set(fuels)
+        self.nonwastes = set(signals)
+        self._reactions = dict() # (reactants, products) = k_fwd
+        self._index = dict() # species = list[(reactants, products)]
+
+    @property
+    def species(self):
+        """ set: Species (other than fuels) which take part in any reaction. """
+        return set(self._index)
+
+    @property
+    def wastes(self):
+        """ set: Species which cannot react with signals, see assign_crn_species. """
+        return set(x for x in self._index if x not in self.nonwastes)
+
+    def add(self, rxn):
+        """ Add a reaction (Reaction tuple of species names). """
+        self._add(rxn.reactants, rxn.products, rxn.k_fwd)
+        if rxn.k_rev:
+            self._add(rxn.products, rxn.reactants, rxn.k_rev)
+
+    def _add(self, reactants, products, rate):
+        R = tuple(sorted(s for s in reactants if s not in self.fuels))
+        P = tuple(sorted(s for s in products if s not in self.fuels))
+        if (R, P) in self._reactions:
+            return
+        self._reactions[(R, P)] = rate
+        for s in set(R + P):
+            self._index.setdefault(s, []).append((R, P))
+        if any(s in self.nonwastes for s in R + P):
+            self._set_nonwastes(R)
+
+    def _set_nonwastes(self, species):
+        # A reactant becomes non-waste if it reacts in the presence of a
+        # non-waste species, which may turn more species into non-wastes.
+        todo = [s for s in species if s not in self.nonwastes]
+        while todo:
+            x = todo.pop()
+            if x in self.nonwastes:
+                continue
+            self.nonwastes.add(x)
+            for R, _ in self._index[x]:
+                todo.extend(s for s in R if s not in self.nonwastes)
+
+    def crn(self, reversible = True):
+        """ list: The verification CRN, without fuel and waste species. """
+        wastes = self.wastes
+        new, seen = [], set()
+        for (R, P), rate in self._reactions.items():
+            R = tuple(s for s in R if s not in wastes)
+            P = tuple(s for s in P if s not in wastes)
+            if R == P or (R, P) in seen:
+                continue
+            new.append(Reaction(list(R), list(P), rate, 0))
+            seen.add((R, P))
+        return combine_reversible_rxns(new) if reversible else new
+
 def split_reversible_rxns(crn):
     """
     Replace every reversible reaction with the two corresponding irreversible
@@ -144,3 +217,176 @@ def cleanup_rxns(crn, reversible = True):
         seen.add((R,P))
     return combine_reversible_rxns(new) if reversible else new
 
+
+def reduce_crn(crn, keep):
+    """ Structural reduction of an implementation CRN prior to verification.
+
+    Two reductions are applied until neither of them changes the CRN. Only
+    species which are not in keep (i.e. intermediates) are removed.
+
+    1) Linear chains: if an intermediate x is produced by exactly one reaction
+       R -> x + Q and consumed by exactly one reaction x -> S (and appears in
+       no other reaction), both reactions are replaced by R -> Q + S.
+    2) Duplicate intermediates: if two intermediates x and y never appear in
+       the same reaction, and renaming x to y maps the reactions of x onto
+       the reactions of y, then x is replaced by y.
+
+    Both reductions leave the formal basis unchanged, they are sound for
+    pathway decomposition. They are not sound for CRN bisimulation: merging
+    R -> x + Q and x -> S discards every interpretation where x stands for
+    a formal species, e.g. the implementation A -> b; b -> C of the formal
+    CRN A -> B; B -> C is only correct with m(b) = B. They are not meant for
+    the hybrid notions either.
+
+    Args:
+        crn (list[Reaction]): A CRN in list of list format.
+        keep (set[str]): Species that must not be removed, e.g. formal
+            species and species of the partial interpretation.
+
+    Returns:
+        [list[Reaction], list[(str, list[str])]]: The reduced (irreversible)
+            CRN, and every removed species with its replacement, in the order
+            of removal (see :func:`expand_interpretation`).
+    """
+    crn = cleanup_rxns(crn, reversible = False)
+    species = lambda crn: set(chain(*(r.reactants + r.products for r in crn)))
+    size = (len(crn), len(species(crn)))
+    removed = []
+    changed = True
+    while changed:
+        changed = False
+        # Linear chains
+        while True:
+            producers, consumers = dict(), dict()
+            for e, rxn in enumerate(crn):
+                for x in set(rxn.reactants):
+                    consumers.setdefault(x, []).append(e)
+                for x in set(rxn.products) - set(rxn.reactants):
+                    producers.setdefault(x, []).append(e)
+            for x in natsorted(set(producers) & set(consumers) - keep):
+                if len(producers[x]) != 1 or len(consumers[x]) != 1:
+                    continue
+                r1, r2 = crn[producers[x][0]], crn[consumers[x][0]]
+                if r2.reactants != [x] or r1.products.count(x) != 1 or x in r2.products:
+                    continue
+                products = [s for s in r1.products if s != x] + r2.products
+                if sorted(products) == sorted(r1.reactants):
+                    continue
+                crn = [rxn for e, rxn in enumerate(crn) if e not in (producers[x][0], 
+                                                                     consumers[x][0])]
+                crn.append(Reaction(r1.reactants, products, r1.k_fwd, 0))
+                crn = cleanup_rxns(crn, reversible = False)
+                removed.append((x, list(r2.products)))
+                changed = True
+                break
+            else:
+                break
+        # Duplicate intermediates
+        contexts = dict()
+        for rxn in crn:
+            for x in set(rxn.reactants + rxn.products) - keep:
+                contexts.setdefault(x, set()).add(
+                        (tuple(sorted('*' if s == x else s for s in rxn.reactants)),
+                         tuple(sorted('*' if s == x else s for s in rxn.products))))
+        groups = dict()
+        for x in natsorted(contexts):
+            groups.setdefault(frozenset(contexts[x]), []).append(x)
+        rename = dict()
+        for names in groups.values():
+            if len(names) < 2:
+                continue
+            for y in names[1:]:
+                # x and y must not appear in the same reaction.
+                if not any(y in set(chain(*rc)) for rc in contexts[names[0]]):
+                    rename[y] = names[0]
+                    removed.append((y, [names[0]]))
+        if rename:
+            crn = cleanup_rxns([Reaction([rename.get(s, s) for s in rxn.reactants],
+                                         [rename.get(s, s) for s in rxn.products],
+                                         rxn.k_fwd, 0) for rxn in crn], reversible = False)
+            changed = True
+    log.info(f'Reduced CRN from {size[0]} to {len(crn)} reactions ' + \
+             f'and from {size[1]} to {len(species(crn))} species.')
+    return crn, removed
+
+def expand_interpretation(interpretation, removed):
+    """ Interpret the species removed by :func:`reduce_crn`.
+
+    Args:
+        interpretation (dict[str] = list[str]): An interpretation of the reduced CRN.
+        removed (list[(str, list[str])]): The removed species and their replacements.
+
+    Returns:
+        dict[str] = list[str]: An interpretation of the original CRN.
+    """
+    interpretation = dict(interpretation)
+    for x, replacement in reversed(removed):
+        interpretation[x] = interpret(replacement, interpretation)
+    return interpretation
+
+def crn_components(crn, species = ()):
+    """ Partition a CRN into species-disjoint components.
+
+    Args:
+        crn (list[[R, P]]): A CRN in list of list format.
+        species (iterable, optional): Additional species, e.g. formal species
+            which do not appear in any reaction.
+
+    Returns:
+        list[(set[str], list)]: The species and reactions of every component,
+            in order of appearance.
+    """
+    parent = dict()
+    def find(x):
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    for rxn in crn:
+        members = list(chain(rxn[0], rxn[1]))
+        for x in members:
+            parent[find(x)] = find(members[0])
+    for x in species:
+        find(x)
+
+    components = dict()
+    for x in parent:
+        components.setdefault(find(x), (set(), []))[0].add(x)
+    for rxn in crn:
+        members = list(chain(rxn[0], rxn[1]))
+        if members:
+            components[find(members[0])][1].append(rxn)
+    return list(components.values())
+
+def project_crn(icrn, components, formals, interpretation = None):
+    """ Assign the reactions of an implementation CRN to formal components.
+
+    Implementation species are grouped by :func:`crn_components`. Every group
+    must contain formal or interpreted species, and they must all belong to
+    the same component of the formal CRN.
+
+    Args:
+        icrn (list[[R, P]]): The implementation CRN.
+        components (list[(set[str], list)]): The formal CRN components.
+        formals (set[str]): The formal species.
+        interpretation (dict, optional): A partial interpretation.
+
+    Returns:
+        list[list]: The implementation CRN of every formal component, or None
+            if the projection is not clean.
+    """
+    interpretation = interpretation or dict()
+    owner = {f: e for e, (fs, _) in enumerate(components) for f in fs}
+    parts = [[] for _ in components]
+    for ispecies, rxns in crn_components(icrn):
+        fspecies = set()
+        for x in ispecies:
+            if x in interpretation:
+                fspecies |= set(interpretation[x])
+            elif x in formals:
+                fspecies.add(x)
+        owners = {owner.get(f) for f in fspecies}
+        if len(owners) != 1 or None in owners:
+            return None
+        parts[owners.pop()].extend(rxns)
+    return parts
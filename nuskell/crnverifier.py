@@ -10,21 +10,699 @@
 import logging
 log = logging.getLogger(__name__)
 
-import signal
-from .crnutils import split_reversible_rxns
-from crnverifier import (pathway_decomposition_eq,
+import os
+import json
+import importlib
+import time
+import random
+import hashlib
+import multiprocessing
+import multiprocessing.connection
+try:
+    import resource
+except ImportError: # pragma: no cover
+    resource = None
+try:
+    import numpy as np
+except ImportError: # pragma: no cover
+    np = None
+
+from collections import Counter
+from functools import cached_property
+from itertools import chain
+from . import __version__ as nuskell_version
+from .crnutils import (Reaction,
+                       split_reversible_rxns, 
+                       reduce_crn, 
+                       expand_interpretation,
+                       crn_components,
+                       project_crn)
+from crnverifier import (__version__ as crnverifier_version,
+                         pathway_decomposition_eq,
                          crn_bisimulation_test, 
                          integrated_hybrid_test,
                          compositional_hybrid_test,
                          modular_crn_bisimulation_test)
+from crnverifier.crn_bisimulation import crn_bisimulations, passes_modularity_condition
+
+# Methods for which the structural reduction of the implementation CRN is sound.
+REDUCIBLE = ('pathway-decomposition',)
+
+# Methods which can verify the components of a formal CRN separately.
+DECOMPOSABLE = ('crn-bisimulation', 'crn-bisimulation-ls', 'crn-bisimulation-bf',
+                'pathway-decomposition')
+
+# Methods with necessary conditions that are checked before verification.
+PRECHECKED = DECOMPOSABLE
+
+# Methods with randomized results, which are never cached.
+RANDOMIZED = ('random-walk',)
+
+# Calls of crnverifier search functions, which are counted in every
+# verification process (see :class:`VerificationStats`).
+SEARCH_COUNTERS = {'search rows': ('crnverifier.crn_bisimulation', 'search_row'),
+                   'search columns': ('crnverifier.crn_bisimulation', 'search_column'),
+                   'permissive checks': ('crnverifier.crn_bisimulation', 
+                                         'passes_permissive_condition'),
+                   'tidy checks': ('crnverifier.pathway_decomposition', 'tidy')}
+
+def _code_version():
+    """ A digest of the nuskell code used for verification (see verification_key). """
+    digest = hashlib.sha256(nuskell_version.encode())
+    for name in ['crnverifier.py', 'crnutils.py']:
+        try:
+            with open(os.path.join(os.path.dirname(__file__), name), 'rb') as f:
+                digest.update(f.read())
+        except OSError: # pragma: no cover
+            pass
+    return digest.hexdigest()
 
-class TimeoutError(Exception):
+# Cached results are only valid for the same verification code.
+CODE_VERSION = _code_version()
+
+# The multiprocessing context of verification processes (see _context).
+_CONTEXT = None
+
+class VerificationError(Exception):
     pass
 
-def handler(signum, frame):
-    raise TimeoutError('Time over')
+def canonical_species(crns, formals, interpretation = None, rounds = 3, 
+                      marks = (), rename_formals = False):
+    """ A canonical renaming of the non-formal species in a list of CRNs.
+
+    Species are colored by name-independent properties (formal species by
+    name, other species by their partial interpretation), and colors are
+    refined by the reactions every species participates in. Non-formal
+    species are then renamed in the order of their color, ties are broken
+    by name. Equal canonical CRNs therefore guarantee equal inputs up to a
+    renaming of species, the same inputs with different species names often
+    (but not always) map to the same canonical CRNs.
+
+    Args:
+      crns (list[list[[R, P]]]): Irreversible CRNs.
+      formals (set[str]): The formal species, which are not renamed.
+      interpretation (dict, optional): A partial interpretation.
+      rounds (int, optional): Rounds of color refinement. Defaults to 3.
+      marks (list[set], optional): Sets of species, membership is part of 
+        the initial color. Defaults to ().
+      rename_formals (bool, optional): Rename formal species as well. Their
+        colors are then refined by the reactions and the interpretation of
+        implementation species. Defaults to False.
+
+    Returns:
+      dict[str] = str: The canonical name of every species.
+    """
+    interpretation = interpretation or dict()
+    species = set(s for crn in crns for rxn in crn for s in chain(*rxn[:2]))
+    species |= set(formals) | set(interpretation)
+    species |= set(chain(*interpretation.values())) if rename_formals else set()
+    def initial(s):
+        mark = tuple(k for k, m in enumerate(marks) if s in m)
+        if s in formals:
+            return ('f', '' if rename_formals else s, mark)
+        inter = interpretation.get(s, [])
+        return ('i', len(inter) if rename_formals else tuple(sorted(inter)), mark)
+    color = {s: initial(s) for s in species}
+    for _ in range(rounds):
+        ranks = {c: n for n, c in enumerate(sorted(set(color.values())))}
+        context = {s: [] for s in species}
+        for k, crn in enumerate(crns):
+            for R, P in (rxn[:2] for rxn in crn):
+                rc = (tuple(sorted(ranks[color[x]] for x in R)), 
+                      tuple(sorted(ranks[color[x]] for x in P)))
+                for x in R:
+                    context[x].append((k, 0, rc))
+                for x in P:
+                    context[x].append((k, 1, rc))
+        if rename_formals:
+            for x, v in interpretation.items():
+                context[x].append((-1, 0, tuple(sorted(ranks[color[f]] for f in v))))
+                for f in v:
+                    context[f].append((-1, 1, ranks[color[x]]))
+        color = {s: (ranks[color[s]], tuple(sorted(context[s]))) for s in species}
+    order = sorted(species, key = lambda s: (color[s], s))
+    names = {s: f'#{n}' for n, s in enumerate(s for s in order if s not in formals)}
+    if rename_formals:
+        names.update({s: f'@{n}' for n, s in enumerate(s for s in order if s in formals)})
+    else:
+        names.update({s: s for s in species if s in formals})
+    return names
+
+def verification_key(method, crns, formals, interpretation = None, marks = (), 
+                     rename_formals = False):
+    """ A hash of a verification input, which is invariant to species names.
+
+    Args:
+      method (str): The verification method.
+      crns (list[list[[R, P]]]): The irreversible (formal and implementation)
+        CRNs passed to the verification method.
+      formals (set[str]): The formal species.
+      interpretation (dict, optional): A partial interpretation.
+      marks, rename_formals: See :func:`canonical_species`.
+
+    Returns:
+      [str, dict]: The key and the canonical name of every species.
+    """
+    names = canonical_species(crns, formals, interpretation, marks = marks, 
+                              rename_formals = rename_formals)
+    data = {'method': method,
+            'version': crnverifier_version,
+            'code': CODE_VERSION,
+            'crns': [sorted([sorted(names[x] for x in R), sorted(names[x] for x in P)]
+                            for R, P in (rxn[:2] for rxn in crn)) for crn in crns],
+            'formals': sorted(names.get(x, x) for x in formals),
+            'interpretation': sorted((names[k], sorted(names.get(x, x) for x in v))
+                                     for k, v in (interpretation or dict()).items())}
+    if marks:
+        data['marks'] = [sorted(names.get(x, x) for x in m) for m in marks]
+    text = json.dumps(data, sort_keys = True)
+    return hashlib.sha256(text.encode()).hexdigest(), names
+
+def rename_interpretation(interpretation, names):
+    """ Rename the species of an interpretation, names may be partial. """
+    return {names.get(k, k): sorted(names.get(x, x) for x in v) 
+                for k, v in interpretation.items()}
+
+class VerificationCache:
+    """ A persistent cache of verification results.
+
+    Results are stored on disk as one JSON file per input, identified by
+    the hash of the method, the canonical CRNs (see
+    :func:`canonical_species`), the formal species, the partial
+    interpretation, the crnverifier version and the nuskell verification code
+    (CODE_VERSION). Inconclusive results (None) are not stored.
+
+    Args:
+      directory (str, optional): The cache directory. Defaults to
+        VerificationCache.DEFAULT_DIR.
+    """
+    DEFAULT_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME', 
+                                              os.path.join('~', '.cache')), 
+                               'nuskell', 'verification')
+
+    def __init__(self, directory = None):
+        self.directory = os.path.expanduser(directory or self.DEFAULT_DIR)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, method, crns, formals, interpretation = None):
+        """ The cache key and canonical species names of a verification input.
+
+        Args:
+          method, crns, formals, interpretation: See :func:`verification_key`.
+
+        Returns:
+          [str, dict]: The key and the canonical name of every species.
+        """
+        if method == 'pathway-decomposition':
+            # The partial interpretation is not used.
+            interpretation = None
+        return verification_key(method, crns, formals, interpretation)
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.json')
+
+    def get(self, key, names):
+        """ The cached (v, i) tuple with original species names, or None. """
+        try:
+            with open(self.path(key)) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        log.debug(f'Verification cache hit: {key}.')
+        original = {v: k for k, v in names.items()}
+        i = data['interpretation']
+        if i is not None:
+            i = rename_interpretation(i, original)
+        return data['result'], i
+
+    def put(self, key, names, v, i):
+        """ Store a conclusive (v, i) tuple under its canonical species names. """
+        if v not in (True, False):
+            return
+        if i is not None:
+            i = rename_interpretation(i, names)
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        # Write and rename, concurrent readers never see a partial file.
+        tmp = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp, 'w') as fh:
+                json.dump({'result': v, 'interpretation': i}, fh)
+            os.replace(tmp, path)
+        except OSError as err:
+            log.warning(f'Cannot write to the verification cache: {err}')
+
+class VerificationStats:
+    """ Instrumentation of a verification call.
+
+    Attributes:
+      method (str): The verification method.
+      wall_time (float): The runtime in seconds, including preprocessing.
+      size (tuple): The number of reactions and species of the irreversible
+        implementation CRN (sum over modules for modular methods).
+      reduced_size (tuple): The same after preprocessing, see
+        :func:`nuskell.crnutils.reduce_crn`.
+      cached (bool): True for a cache hit, False for a cache miss, None if no
+        cache was used.
+      rejected (str): The reason of a rejection by :func:`precheck`, or None.
+      hints (int): The number of interpretation hints.
+      parts (int): The number of separately verified components, or classes
+        of isomorphic modules.
+      counters (dict): Calls of crnverifier search functions (see
+        SEARCH_COUNTERS) in all verification processes, including processes
+        which were stopped at the deadline. Verifications in the calling
+        process (no deadline, no memory limit) are not counted.
+    """
+    def __init__(self, method = None):
+        self.method = method
+        self.wall_time = 0.
+        self.size = None
+        self.reduced_size = None
+        self.cached = None
+        self.rejected = None
+        self.hints = 0
+        self.parts = 0
+        self.counters = dict.fromkeys(SEARCH_COUNTERS, 0)
+
+    def count(self, counters):
+        """ Add the counters of a verification process. """
+        for name, n in zip(SEARCH_COUNTERS, counters):
+            self.counters[name] += n
+
+    def __str__(self):
+        items = [f'{self.wall_time:.2f} s']
+        if self.size:
+            items.append('{} reactions, {} species'.format(*self.size))
+        if self.reduced_size and self.reduced_size != self.size:
+            items.append('reduced to {} reactions, {} species'.format(*self.reduced_size))
+        if self.rejected:
+            items.append('rejected by pre-check')
+        if self.hints:
+            items.append(f'hints: {self.hints}')
+        if self.parts:
+            items.append(f'parts: {self.parts}')
+        if self.cached is not None:
+            items.append('cache hit' if self.cached else 'cache miss')
+        items.extend(f'{k}: {v}' for k, v in self.counters.items() if v)
+        return ', '.join(items)
+
+def crn_size(crn):
+    """ The number of reactions and species of a CRN. """
+    return len(crn), len(set(chain(*[chain(*rxn[:2]) for rxn in crn])))
+
+class FormalCRN:
+    """ A formal CRN prepared for verification.
+
+    The formal side of a verification problem does not depend on the
+    implementation CRN. If the same formal CRN is verified against many
+    implementation CRNs (e.g. in compare_schemes), prepare it once and pass
+    it to :func:`verify`, :func:`verify_modules` or :func:`verify_portfolio`
+    in place of the formal CRN. The species-disjoint components (for
+    decomposition) and the conservation laws (for pre-checks) are computed
+    when they are needed for the first time.
+
+    Args:
+      crn (list): A formal CRN of Reaction tuples as returned from
+        parse_crn_string (reversible reactions are split), an irreversible CRN
+        of [R, P] lists, or a FormalCRN object.
+      formals (set[str]): The formal species.
+
+    Attributes:
+      crn (list[[R, P]]): The irreversible formal CRN.
+      formals (frozenset): The formal species.
+      species (set): The species in the reactions of the formal CRN.
+      reactions (set): Every reaction as tuples of sorted reactants and products.
+    """
+    def __init__(self, crn, formals):
+        if isinstance(crn, FormalCRN):
+            self.crn = crn.crn
+        else:
+            self.crn = []
+            for rxn in crn:
+                if isinstance(rxn, Reaction):
+                    self.crn.extend([r.reactants, r.products] 
+                                    for r in split_reversible_rxns([rxn]))
+                else:
+                    R, P = rxn
+                    self.crn.append([list(R), list(P)])
+        self.formals = frozenset(formals)
+        self.species = set(chain(*[chain(*rxn) for rxn in self.crn]))
+        self.reactions = set((tuple(sorted(R)), tuple(sorted(P))) for R, P in self.crn)
+
+    @classmethod
+    def prepare(cls, crn, formals):
+        """ A FormalCRN object for crn, which is reused if possible. """
+        if isinstance(crn, cls) and crn.formals == set(formals):
+            return crn
+        return cls(crn, formals)
+
+    @cached_property
+    def components(self):
+        """ See :func:`nuskell.crnutils.crn_components`. """
+        return crn_components(self.crn, self.formals)
 
-def verify(fcrn, icrn, formals, method, interpretation = None, timeout = 0):
+    @cached_property
+    def conservation_laws(self):
+        """ The sorted formal species and a basis of the conservation laws.
+
+        A conservation law is a weighting of formal species which is not
+        changed by any formal reaction (one row of the returned matrix). The
+        basis is None if NumPy is not available.
+        """
+        fsp = sorted(self.formals | self.species)
+        if np is None:
+            return fsp, None
+        fidx = {f: n for n, f in enumerate(fsp)}
+        N = np.zeros((len(self.crn), len(fsp)))
+        for j, (R, P) in enumerate(self.crn):
+            for x in R: 
+                N[j, fidx[x]] -= 1
+            for x in P: 
+                N[j, fidx[x]] += 1
+        if not len(self.crn):
+            return fsp, np.eye(len(fsp))
+        _, sv, vh = np.linalg.svd(N)
+        return fsp, vh[int(np.sum(sv > 1e-9)):]
+
+def run_with_limits(func, args, timeout = 0, memory = 0, stats = None):
+    """ Call func(*args) in a child process with a deadline and a memory limit.
+
+    The child process is killed when the deadline is exceeded. Exceptions
+    raised by func are raised again in the calling process.
+
+    Args:
+      func (function): A module-level function returning a (v, i) tuple.
+      args (tuple): The arguments of func.
+      timeout (int, optional): The deadline in seconds. Defaults to 0, i.e. no
+        deadline.
+      memory (int, optional): The address space limit of the child process in
+        MiB. Defaults to 0, i.e. no limit.
+      stats (:obj:`VerificationStats`, optional): Add the search counters of
+        the child process. Defaults to None. Search calls are not counted if
+        func is called in the calling process.
+
+    Without a deadline and a memory limit, func is called in the calling
+    process.
+
+    Returns:
+      The return value of func, or (None, None) if the child process exceeded
+      the deadline or the memory limit.
+
+    Raises:
+      VerificationError: If the child process terminated without a result.
+    """
+    if timeout <= 0 and not memory:
+        return func(*args)
+    proc, recv = _start(func, args, memory)
+    try:
+        if recv.poll(timeout if timeout > 0 else None):
+            success, result = _receive(proc, recv)
+        else:
+            log.info(f'Verification did not terminate within {timeout} seconds.')
+            success, result = True, (None, None)
+    finally:
+        _stop(proc, recv)
+        if stats is not None:
+            stats.count(proc.counters)
+    if not success:
+        raise result
+    return result
+
+def cached_run(cache, method, crns, formals, interpretation, run):
+    """ Call run(), unless the result is in the cache. 
+
+    Args:
+      cache (:obj:`VerificationCache`): The cache, or None.
+      method, crns, formals, interpretation: See :meth:`VerificationCache.key`.
+      run (function): Returns the (v, i) tuple of the verification.
+    """
+    if cache is None:
+        return run()
+    key, names = cache.key(method, crns, formals, interpretation)
+    result = cache.get(key, names)
+    if result is None:
+        result = run()
+        cache.put(key, names, *result)
+    return result
+
+def run_concurrently(tasks, timeout = 0, memory = 0, workers = 0, counters = None):
+    """ Call several functions in child processes with a shared deadline.
+
+    Args:
+      tasks (dict[key] = (func, args)): The functions and their arguments, see
+        :func:`run_with_limits`.
+      timeout (int, optional): The deadline (in seconds) for all tasks.
+        Defaults to 0, i.e. no timeout.
+      memory (int, optional): The memory limit (in MiB) of every process.
+        Defaults to 0, i.e. no limit.
+      workers (int, optional): The maximum number of processes running at the
+        same time. Defaults to 0, i.e. one process for every CPU.
+      counters (dict, optional): Store the search counters of every task
+        (see SEARCH_COUNTERS) under its key. Defaults to None.
+
+    Yields:
+      (key, bool, object, float): The key of a task, False if the function
+        raised an exception, the return value (or the exception) and the
+        runtime in seconds, in the order in which the tasks finish. Tasks
+        which did not finish before the deadline return (None, None).
+        Closing the generator stops all processes.
+    """
+    deadline = time.monotonic() + timeout if timeout > 0 else None
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    pending = list(tasks.items())
+    running = dict()
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                key, (func, args) = pending.pop(0)
+                proc, recv = _start(func, args, memory)
+                running[recv] = (key, proc, time.monotonic())
+            wait = None if deadline is None else max(0, deadline - time.monotonic())
+            ready = multiprocessing.connection.wait(list(running), timeout = wait)
+            if not ready:
+                break
+            for recv in ready:
+                key, proc, start = running.pop(recv)
+                success, result = _receive(proc, recv)
+                _stop(proc, recv)
+                if counters is not None:
+                    counters[key] = list(proc.counters)
+                yield key, success, result, time.monotonic() - start
+        now = time.monotonic()
+        for key, proc, start in list(running.values()):
+            if counters is not None:
+                counters[key] = list(proc.counters)
+            log.info(f'Verification did not terminate within {timeout} seconds: {key}.')
+            yield key, True, (None, None), now - start
+        for key, _ in pending:
+            yield key, True, (None, None), 0
+    finally:
+        for recv, (_, proc, _) in running.items():
+            _stop(proc, recv)
+        running.clear()
+
+def verify_portfolio(fcrn, icrn, formals, methods, interpretation = None, 
+                     fcrns = None, icrns = None, timeout = 0, memory = 0, 
+                     first = False, catch = (), cache = None, reduce = False, 
+                     prefilter = False, samples = 1000, instrument = False):
+    """ Run several verification methods concurrently in child processes.
+
+    The methods are the names of the --verify option, i.e. modular methods
+    verify the modules fcrns and icrns if there is more than one module, and
+    the full CRNs otherwise. All methods share the same deadline, at most one
+    process per CPU runs at the same time.
+
+    Args:
+      fcrn, icrn, formals, interpretation: See :func:`verify`.
+      methods (list[str]): The verification methods.
+      fcrns (list, optional): The formal CRN modules (or :obj:`FormalCRN`
+        objects). Defaults to None.
+      icrns (list, optional): The implementation CRN modules. Defaults to None.
+      timeout (int, optional): The deadline (in seconds) for all methods.
+        Defaults to 0, i.e. no timeout.
+      memory (int, optional): The memory limit (in MiB) of every method.
+        Defaults to 0, i.e. no limit.
+      first (bool, optional): Stop all other methods after the first
+        conclusive result (True or False). Defaults to False.
+      catch (tuple, optional): Exception types which are returned as the
+        result of a method instead of being raised. Defaults to ().
+      cache (:obj:`VerificationCache`, optional): Look up and store results
+        in a verification cache. Defaults to None.
+      reduce (bool, optional): Reduce the implementation CRN for methods
+        where this is sound, see :func:`verify`. Defaults to False.
+      prefilter (bool, optional): Check necessary conditions before starting
+        a (non-modular) method, see :func:`verify`. Defaults to False.
+      samples (int, optional): The number of random-walk samples. Defaults
+        to 1000.
+      instrument (bool, optional): Yield a :obj:`VerificationStats` object
+        as fourth element. Defaults to False.
+
+    Yields:
+      (str, bool, dict): The method, the verification result and the
+        interpretation, in the order in which the methods finish. Methods
+        which did not finish before the deadline yield (method, None, None),
+        methods which were stopped after a conclusive result yield nothing.
+    """
+    start = time.perf_counter()
+    split = lambda crn: [list(rxn[:2]) for rxn in split_reversible_rxns(crn)]
+    tasks, keys, removed, rejected = dict(), dict(), dict(), []
+    stats = {meth: VerificationStats(meth) for meth in methods}
+    def report(meth, v, i):
+        stats[meth].wall_time = time.perf_counter() - start
+        return (meth, v, i, stats[meth]) if instrument else (meth, v, i)
+
+    formal = FormalCRN.prepare(fcrn, formals)
+    for meth in methods:
+        if 'modular-' in meth and fcrns is not None and len(fcrns) > 1:
+            args = ([FormalCRN.prepare(m, formals).crn for m in fcrns], 
+                    [split(m) for m in icrns], 
+                    formals, meth[8:], interpretation)
+            stats[meth].size = stats[meth].reduced_size = \
+                    tuple(map(sum, zip(*map(crn_size, args[1]))))
+            tasks[meth] = (_verify_modules, args)
+            if cache is not None:
+                keys[meth] = cache.key(meth, args[0] + args[1], formals, interpretation)
+        else:
+            name = meth[8:] if 'modular' in meth else meth
+            rcrn, removed[meth] = reduced_crn(icrn, formals, name, interpretation, reduce)
+            args = (formal.crn, split(rcrn), formals, name, interpretation, samples)
+            stats[meth].size = crn_size(split(icrn))
+            stats[meth].reduced_size = crn_size(args[1])
+            reason = precheck(formal, *args[1:5]) if prefilter else None
+            stats[meth].rejected = reason
+            if reason:
+                log.info(f'Rejected by the pre-check of {meth}: {reason}')
+                rejected.append(meth)
+                continue
+            tasks[meth] = (_verify, args)
+            if cache is not None and name not in RANDOMIZED:
+                keys[meth] = cache.key(name, args[:2], formals, interpretation)
+
+    for meth in rejected:
+        yield report(meth, False, None)
+        if first:
+            return
+
+    for meth in list(tasks):
+        result = cache.get(*keys[meth]) if meth in keys else None
+        if result is not None:
+            del tasks[meth]
+            if removed.get(meth) and result[1]:
+                result = (result[0], expand_interpretation(result[1], removed[meth]))
+            stats[meth].cached = True
+            yield report(meth, *result)
+            if first and result[0] in (True, False):
+                return
+
+    counters = dict()
+    results = run_concurrently(tasks, timeout = timeout, memory = memory, counters = counters)
+    try:
+        for meth, success, result, _ in results:
+            if not success:
+                if not isinstance(result, catch):
+                    raise result
+                result = (result, None)
+            log.info(f'Verification result of {meth}: {result[0]}.')
+            if meth in keys:
+                cache.put(*keys[meth], *result)
+            if removed.get(meth) and result[1]:
+                result = (result[0], expand_interpretation(result[1], removed[meth]))
+            stats[meth].count(counters.get(meth, []))
+            if meth in keys:
+                stats[meth].cached = False
+            yield report(meth, *result)
+            if first and result[0] in (True, False):
+                log.info(f'Stopping the remaining verification methods.')
+                return
+    finally:
+        results.close()
+
+def _context():
+    """ The multiprocessing context of verification processes.
+
+    Verification processes can be stopped at any time without signal
+    handlers. A forkserver avoids forking a (possibly multi-threaded) parent
+    process, spawn is the fallback.
+    """
+    global _CONTEXT
+    if _CONTEXT is None:
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload([__name__])
+        else: # pragma: no cover
+            context = multiprocessing.get_context('spawn')
+        _CONTEXT = context
+    return _CONTEXT
+
+def _start(func, args, memory):
+    """ Start a verification process and return the process and the pipe. """
+    context = _context()
+    recv, send = context.Pipe(duplex = False)
+    counters = context.RawArray('q', len(SEARCH_COUNTERS))
+    proc = context.Process(target = _child, 
+                           args = (send, func, args, memory, counters), 
+                           daemon = True)
+    proc.start()
+    proc.counters = counters
+    send.close()
+    return proc, recv
+
+def _receive(proc, recv):
+    """ The (success, result) tuple sent by a verification process. """
+    try:
+        return recv.recv()
+    except EOFError:
+        proc.join()
+        return False, VerificationError('Verification process terminated ' + \
+                f'without a result (exit code {proc.exitcode}).')
+
+def _stop(proc, recv):
+    """ Kill a verification process (if it is still running) and clean up. """
+    if proc.is_alive():
+        proc.kill()
+    proc.join()
+    recv.close()
+
+def _child(conn, func, args, memory, counters):
+    """ Entry point of the verification process, see :func:`run_with_limits`. """
+    _count_calls(counters)
+    if memory and resource is not None:
+        limit = memory * 2**20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    try:
+        result = (True, func(*args))
+    except MemoryError:
+        log.warning(f'Verification exceeded the memory limit of {memory} MiB.')
+        result = (True, (None, None))
+    except Exception as err:
+        result = (False, err)
+    conn.send(result)
+    conn.close()
+
+def _count_calls(counters):
+    """ Count the calls of crnverifier search functions in this process.
+
+    The functions are wrapped to increment the (shared memory) counters. This
+    is only done in verification processes, which exit after a single
+    verification, the calling process is never modified.
+    """
+    for k, (module, name) in enumerate(SEARCH_COUNTERS.values()):
+        module = importlib.import_module(module)
+        func = getattr(module, name, None)
+        if func is None: # pragma: no cover
+            continue
+        def counted(*args, _k = k, _func = func, **kwargs):
+            counters[_k] += 1
+            return _func(*args, **kwargs)
+        setattr(module, name, counted)
+
+def verify(fcrn, icrn, formals, method, interpretation = None, timeout = 0, memory = 0,
+           cache = None, reduce = False, decompose = False, prefilter = False, 
+           samples = 1000, hints = False, instrument = False):
     """Verify the equivalence of a formal CRN and its implementation CRN.
 
     This wrapper function for two notions of equivalence (bisimulation and
@@ -33,7 +711,8 @@ def verify(fcrn, icrn, formals, method, interpretation = None, timeout = 0):
     Args:
       formal_crn (list[list[...]]): List of list data structure for formal CRNs
         as returned from the **nuskell.parser** module. The CRN must specify
-        reversible reactions as two irreversible reactions.
+        reversible reactions as two irreversible reactions. Alternatively, a
+        :obj:`FormalCRN`, which is prepared only once for many verifications.
       impl_crn (list[list[...]]): List of list data structure for implementation
         CRNs as returned from the **nuskell.parser** module. The CRN must specify
         reversible reactions as two irreversible reactions.
@@ -45,74 +724,697 @@ def verify(fcrn, icrn, formals, method, interpretation = None, timeout = 0):
         'pathway', 'integrated'.
       timeout (int, optional): Set a timeout (in seconds) for verification. Defaults
         to 0, i.e. no timeout.
+      memory (int, optional): Set a memory limit (in MiB) for verification.
+        Defaults to 0, i.e. no limit.
+      cache (:obj:`VerificationCache`, optional): Look up and store results in
+        a verification cache. Defaults to None.
+      reduce (bool, optional): Reduce the implementation CRN with
+        :func:`nuskell.crnutils.reduce_crn` first, if that is sound for the
+        method (pathway-decomposition only). Defaults to False.
+      decompose (bool, optional): Verify the species-disjoint components of
+        the formal CRN separately, if the implementation CRN can be projected
+        onto them (see :func:`decompose_verification`). If a component is
+        not correct, the full CRN is verified with the remaining time.
+        Defaults to False.
+      prefilter (bool, optional): Reject the implementation CRN without
+        calling crnverifier if it fails a necessary condition (see
+        :func:`precheck`). Defaults to False.
+      samples (int, optional): The number of trajectories sampled by the
+        'random-walk' method (see :func:`random_walk_test`). Defaults to 1000.
+      hints (bool, optional): For crn-bisimulation, first try to verify with
+        the partial interpretation extended by :func:`interpretation_hints`.
+        If that does not return True, verify with the original partial
+        interpretation. Defaults to False.
+      instrument (bool, optional): Return a :obj:`VerificationStats` object
+        as third element. Defaults to False.
+
+    With a timeout or a memory limit, verification runs in a child process
+    (see :func:`run_with_limits`), so it can be called from any thread.
 
     Returns:
-      bool: True if equivalent, False otherwise.
+      bool: True if equivalent, False otherwise, None if verification did not
+        terminate within the timeout or the memory limit. The random-walk
+        method returns False and a list of counterexample traces instead of
+        an interpretation, or (None, None) if there is no counterexample.
 
     """
-    fcrn = [list(rxn[:2]) for rxn in split_reversible_rxns(fcrn)]
+    start = time.perf_counter()
+    stats = VerificationStats(method)
+    stats.size = crn_size(split_reversible_rxns(icrn))
+    formal = FormalCRN.prepare(fcrn, formals)
+    fcrn = formal.crn
+    icrn, removed = reduced_crn(icrn, formals, method, interpretation, reduce)
     icrn = [list(rxn[:2]) for rxn in split_reversible_rxns(icrn)]
+    stats.reduced_size = crn_size(icrn)
+
+    def result(v, i):
+        stats.wall_time = time.perf_counter() - start
+        return (v, i, stats) if instrument else (v, i)
+
+    if prefilter:
+        stats.rejected = precheck(formal, icrn, formals, method, interpretation)
+        if stats.rejected:
+            log.info(f'Rejected by the pre-check of {method}: {stats.rejected}')
+            return result(False, None)
+
+    def attempt(inter, timeout = timeout):
+        parts = None
+        if decompose and method in DECOMPOSABLE:
+            parts = decompose_verification(formal, icrn, formals, inter)
+        full = lambda t: run_with_limits(_verify, (fcrn, icrn, formals, method, inter, samples), 
+                                         timeout = t, memory = memory, stats = stats)
+        if not parts:
+            return lambda: full(timeout)
+        stats.parts = len(parts)
+        def components():
+            # Correct components imply a correct system, not vice versa.
+            deadline = time.monotonic() + timeout if timeout > 0 else None
+            v, i = verify_components(parts, method, timeout = timeout, 
+                                     memory = memory, stats = stats)
+            if v is True or v is None:
+                return v, i
+            left = 0
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return None, None
+            log.info(f'Component verification returned {v}, verifying the full CRN.')
+            return full(left)
+        return components
+    run = attempt(interpretation)
+
+    extra = None
+    if hints and 'crn-bisimulation' in method:
+        extra = interpretation_hints(icrn, interpretation or dict())
+        stats.hints = len(extra)
+    if extra:
+        log.info('Interpretation hints:\n  ' + \
+                 '\n  '.join(f"{k} => {', '.join(v)}" for k, v in sorted(extra.items())))
+        hinted = attempt({**(interpretation or dict()), **extra})
+        def run():
+            # Both attempts share the deadline.
+            deadline = time.monotonic() + timeout if timeout > 0 else None
+            v, i = hinted()
+            if v is True:
+                return v, i
+            left = 0
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    log.info(f'Verification did not terminate within {timeout} seconds.')
+                    return None, None
+            log.info(f'Verification with {len(extra)} interpretation hints returned {v}, ' + \
+                      'verifying with the original partial interpretation.')
+            return attempt(interpretation, left)()
+    if method in RANDOMIZED:
+        cache = None
+    hits = cache.hits if cache is not None else 0
+    v, i = cached_run(cache, method, [fcrn, icrn], formals, interpretation, run)
+    if cache is not None:
+        stats.cached = cache.hits > hits
+    if removed and i:
+        i = expand_interpretation(i, removed)
+    return result(v, i)
+
+def reduced_crn(icrn, formals, method, interpretation = None, reduce = True):
+    """ Apply :func:`nuskell.crnutils.reduce_crn` if it is sound for the method.
+
+    Returns:
+      [list, list]: The (reduced) implementation CRN and the removed species.
+    """
+    if not reduce or method not in REDUCIBLE:
+        return icrn, []
+    return reduce_crn(icrn, set(formals) | set(interpretation or dict()))
+
+def decompose_verification(fcrn, icrn, formals, interpretation = None):
+    """ Split a verification problem along the components of the formal CRN.
+
+    If the formal CRN consists of species-disjoint components, and every
+    connected group of implementation species contains formal or interpreted
+    species of exactly one formal component (see 
+    :func:`nuskell.crnutils.project_crn`), then the implementation CRN is the
+    disjoint union of implementations of every formal component. If all
+    components are equivalent, then the CRNs are equivalent, and the
+    interpretations of the components combine into an interpretation of the
+    full system. The converse is not guaranteed: if a component is not
+    equivalent, only the full CRN can tell (see :func:`verify`).
 
-    signal.signal(signal.SIGALRM, handler)
-    signal.alarm(timeout)
+    Args:
+      fcrn (list[[R, P]]): The irreversible formal CRN, or a :obj:`FormalCRN`.
+      icrn (list[[R, P]]): The irreversible implementation CRN.
+      formals, interpretation: See :func:`verify`.
+
+    Returns:
+      list[(fcrn, icrn, formals, interpretation)]: The verification inputs of
+        every component, or None if there is only one component or the
+        projection is not clean.
+    """
+    components = FormalCRN.prepare(fcrn, formals).components
+    if len(components) < 2:
+        return None
+    iparts = project_crn(icrn, components, formals, interpretation)
+    if iparts is None:
+        log.info(f'Cannot project the implementation CRN onto {len(components)} ' + \
+                  'formal CRN components, verifying the full CRN.')
+        return None
+    parts = []
+    for (fspecies, fpart), ipart in zip(components, iparts):
+        ispecies = set(chain(*(chain(*rxn) for rxn in ipart)))
+        inter = {k: v for k, v in (interpretation or dict()).items() if k in ispecies}
+        parts.append((fpart, ipart, fspecies & set(formals), inter))
+    log.info(f'Decomposed verification into {len(parts)} formal CRN components.')
+    return parts
+
+def verify_components(parts, method, timeout = 0, memory = 0, stats = None):
+    """ Verify the components of :func:`decompose_verification` concurrently.
+
+    All components share one deadline, and all processes are stopped as soon
+    as one component is not correct. The search counters of all components
+    are added to stats (a :obj:`VerificationStats` object), if given.
+
+    Returns:
+      [bool, dict]: The combined verdict and interpretation.
+    """
+    tasks = {e: (_verify, (f, i, fs, method, inter)) for e, (f, i, fs, inter) 
+                                                        in enumerate(parts, 1)}
+    inter, times, counters = dict(), dict(), dict()
+    results = run_concurrently(tasks, timeout = timeout, memory = memory, 
+                               counters = counters)
     try:
-        if 'crn-bisimulation' in method:
-            if method[-2:] == '-ls':
-                permissive_check = 'loopsearch'
-            elif method[-2:] == '-bf':
-                permissive_check = 'bruteforce'
-            else:
-                permissive_check = 'graphsearch'
-            v, i = crn_bisimulation_test(fcrn, 
+        for e, success, result, seconds in results:
+            times[e] = seconds
+            if not success:
+                raise result
+            v, i = result
+            if v is not True:
+                log.info(f'Component {e} verification result: {v}. Stopping all components.')
+                return v, None
+            inter.update(i or dict())
+    finally:
+        results.close()
+        for c in counters.values() if stats is not None else []:
+            stats.count(c)
+        slowest = sorted(times.items(), key = lambda x: -x[1])[:3]
+        log.info('Slowest component verifications: ' + \
+                ', '.join(f'component {e} ({t:.2f} s)' for e, t in slowest))
+    return True, (inter if 'crn-bisimulation' in method else None)
+
+def precheck(fcrn, icrn, formals, method, interpretation = None):
+    """ Cheap necessary conditions for the correctness of an implementation CRN.
+
+    A failed check means that the implementation CRN is not correct according
+    to the method, passing all checks means nothing. The checks are:
+
+    - every formal reaction must be achievable from its formal reactants 
+      (see :func:`unachievable_reaction`),
+    - for CRN bisimulation: implementation reactions with interpreted species
+      only must interpret to formal or trivial reactions (see
+      :func:`uninterpretable_reaction`), and the conservation laws of the
+      formal CRN must be conserved by the implementation CRN (see
+      :func:`violated_conservation`). The latter requires NumPy.
+
+    Pathway decomposition does not use the partial interpretation, formal
+    species are identified by name instead.
+
+    Args:
+      fcrn (list[[R, P]]): The irreversible formal CRN, or a :obj:`FormalCRN`.
+      icrn (list[[R, P]]): The irreversible implementation CRN.
+      formals, method, interpretation: See :func:`verify`.
+
+    Returns:
+      str: The reason why the implementation CRN is not correct, or None.
+    """
+    if method not in PRECHECKED:
+        return None
+    formal = FormalCRN.prepare(fcrn, formals)
+    if 'crn-bisimulation' in method:
+        inter = dict(interpretation or dict())
+    else:
+        inter = {f: [f] for f in formals}
+    reason = unachievable_reaction(formal.crn, icrn, inter, 
+                                   unknown = 'crn-bisimulation' in method)
+    if reason is None and 'crn-bisimulation' in method:
+        reason = uninterpretable_reaction(formal, icrn, inter) or \
+                 violated_conservation(formal, icrn, formals, inter)
+    return reason
+
+def unachievable_reaction(fcrn, icrn, interpretation, unknown = True):
+    """ Find a formal reaction that the implementation CRN cannot achieve.
+
+    Starting from the implementation species which are interpreted as
+    exactly one formal reactant, every implementation reaction can fire if
+    all of its reactants are present (in unlimited copies). A formal reaction
+    is not achievable if no implementation reaction can fire, or if a formal
+    product cannot appear in the interpretation of any reachable species.
+    Formal reactions with a reactant that has no such implementation species
+    are not tested.
+
+    Args:
+      fcrn, icrn (list[[R, P]]): Irreversible formal and implementation CRNs.
+      interpretation (dict): A partial interpretation.
+      unknown (bool, optional): Species without interpretation may be
+        interpreted as any formal species. Defaults to True.
+
+    Returns:
+      str: A description of the first unachievable formal reaction, or None.
+    """
+    signals = dict()
+    for k, v in interpretation.items():
+        if len(v) == 1:
+            signals.setdefault(v[0], set()).add(k)
+
+    for R, P in (rxn[:2] for rxn in fcrn):
+        if sorted(R) == sorted(P) or not all(x in signals for x in R):
+            continue
+        present = set().union(*[signals[x] for x in R])
+        fired, todo = 0, list(icrn)
+        while True:
+            ready = [rxn for rxn in todo if all(x in present for x in rxn[0])]
+            if not ready:
+                break
+            todo = [rxn for rxn in todo if not all(x in present for x in rxn[0])]
+            fired += len(ready)
+            present.update(chain(*[rxn[1] for rxn in ready]))
+        possible = lambda f: any(f in interpretation[x] if x in interpretation 
+                                 else unknown for x in present)
+        if not fired or not all(possible(f) for f in P):
+            return f"Formal reaction {' + '.join(R)} -> {' + '.join(P)} is not achievable."
+    return None
+
+def uninterpretable_reaction(fcrn, icrn, interpretation):
+    """ Find an interpreted implementation reaction which is neither formal nor trivial.
+
+    Returns:
+      str: A description of the first such implementation reaction, or None.
+    """
+    if not isinstance(fcrn, FormalCRN):
+        fcrn = FormalCRN(fcrn, ())
+    formal = fcrn.reactions
+    for R, P in (rxn[:2] for rxn in icrn):
+        if not all(x in interpretation for x in chain(R, P)):
+            continue
+        mR = tuple(sorted(chain(*[interpretation[x] for x in R])))
+        mP = tuple(sorted(chain(*[interpretation[x] for x in P])))
+        if mR != mP and (mR, mP) not in formal:
+            return f"Implementation reaction {' + '.join(R)} -> {' + '.join(P)} " + \
+                   f"interprets to {' + '.join(mR)} -> {' + '.join(mP)}."
+    return None
+
+def violated_conservation(fcrn, icrn, formals, interpretation):
+    """ Test whether the formal conservation laws hold in the implementation CRN.
+
+    A conservation law of the formal CRN is a weighting of formal species
+    which is not changed by any formal reaction. In a correct implementation
+    every implementation reaction interprets to a formal or trivial reaction,
+    so the law is conserved if implementation species are weighted by the
+    weight of their interpretation. This fails if the linear equations for
+    the (real valued) weights of uninterpreted species have no solution.
+
+    Returns:
+      str: The reason why the conservation laws are violated, or None. None
+        if NumPy is not available.
+    """
+    fsp, laws = FormalCRN.prepare(fcrn, formals).conservation_laws
+    if laws is None or not len(laws):
+        return None
+    fidx = {f: n for n, f in enumerate(fsp)}
+
+    isp = sorted(set(chain(*[chain(*rxn[:2]) for rxn in icrn])) - set(interpretation))
+    iidx = {x: n for n, x in enumerate(isp)}
+    A = np.zeros((len(icrn), len(isp)))
+    K = np.zeros((len(icrn), len(fsp)))
+    for j, (R, P) in enumerate(rxn[:2] for rxn in icrn):
+        for sign, side in ((-1, R), (1, P)):
+            for x in side:
+                if x in interpretation:
+                    for f in interpretation[x]:
+                        K[j, fidx[f]] += sign
+                else:
+                    A[j, iidx[x]] += sign
+    B = -K @ laws.T
+    if len(isp):
+        B = B - A @ np.linalg.lstsq(A, B, rcond = None)[0]
+    if not np.allclose(B, 0, atol = 1e-6):
+        return 'The implementation CRN violates a conservation law of the formal CRN.'
+    return None
+
+def interpretation_hints(icrn, interpretation):
+    """ Propose interpretations for intermediates which are not yet committed.
+
+    An uninterpreted species is interpreted by its only producing reaction, if
+    that reaction is reversible and all of its other species are interpreted:
+    the species represents the reactants minus the other products. Both
+    directions of the reaction are then trivial, i.e. the intermediate has not
+    committed to a formal reaction yet. A typical example is a signal species
+    bound to the gate of a formal reaction. Hints are propagated along chains
+    of such reactions.
+
+    The hints are a guess, they may exclude every CRN bisimulation.
+
+    Args:
+      icrn (list[[R, P]]): An irreversible implementation CRN.
+      interpretation (dict): The partial interpretation.
+
+    Returns:
+      dict: The interpretation of intermediates that are not part of the
+        partial interpretation.
+    """
+    rxns = set((tuple(sorted(R)), tuple(sorted(P))) for R, P in (rxn[:2] for rxn in icrn))
+    producers = dict()
+    for R, P in rxns:
+        for x in set(P):
+            if P.count(x) > R.count(x):
+                producers.setdefault(x, []).append((R, P))
+
+    inter = dict(interpretation)
+    changed = True
+    while changed:
+        changed = False
+        for x, prods in sorted(producers.items()):
+            if x in inter or len(prods) != 1:
+                continue
+            R, P = prods[0]
+            if (P, R) not in rxns:
+                continue
+            others = list(P)
+            others.remove(x)
+            if not all(y in inter for y in chain(R, others)):
+                continue
+            mR = Counter(chain(*[inter[y] for y in R]))
+            mO = Counter(chain(*[inter[y] for y in others]))
+            if mO - mR or not mR - mO:
+                continue
+            inter[x] = sorted((mR - mO).elements())
+            changed = True
+    return {k: v for k, v in inter.items() if k not in interpretation}
+
+def random_walk_test(fcrn, icrn, formals, interpretation = None, samples = 1000, 
+                     steps = 100, max_traces = 3, seed = None):
+    """ Search for counterexamples along random trajectories of the implementation CRN.
+
+    Every sample starts from implementation species which are interpreted as
+    exactly one formal species: the reactants of a random formal reaction
+    and up to two random formal species. One of the enabled implementation
+    reactions is chosen uniformly at random in every step. Whenever all
+    species of the current state are interpreted, the interpreted state
+    must be reachable from the last such state with at most as many formal
+    reactions as there were implementation steps in between. Otherwise, no
+    interpretation of the intermediates turns the trajectory into a formal
+    trajectory, i.e. the implementation CRN is not correct according to CRN
+    bisimulation. The opposite direction (every formal reaction can be
+    implemented) is not tested.
+
+    Args:
+      fcrn, icrn (list[[R, P]]): Irreversible formal and implementation CRNs.
+      formals (set[str]): The formal species.
+      interpretation (dict, optional): A partial interpretation.
+      samples (int, optional): The number of trajectories. Defaults to 1000.
+      steps (int, optional): The maximum length of a trajectory. Defaults to 100.
+      max_traces (int, optional): Stop after this many counterexamples.
+        Defaults to 3.
+      seed (int, optional): Seed of the random number generator. Defaults to
+        None.
+
+    Returns:
+      [bool, list]: False and the counterexample traces, i.e. the initial
+        state and the implementation reactions of the trajectory up to the
+        first uninterpretable state, or (None, None) if there is no
+        counterexample.
+    """
+    inter = interpretation or dict()
+    signals = dict()
+    for k, v in sorted(inter.items()):
+        if len(v) == 1:
+            signals.setdefault(v[0], []).append(k)
+    if not signals:
+        log.warning('Random walk: there are no interpreted signal species.')
+        return None, None
+    starts = [R for R, _ in (rxn[:2] for rxn in fcrn) if all(x in signals for x in R)]
+    moves = [(Counter(R), Counter(P)) for R, P in (rxn[:2] for rxn in fcrn)]
+    rxns = [(Counter(R), Counter(P), [R, P]) for R, P in (rxn[:2] for rxn in icrn)]
+    interpret = lambda state: Counter(chain(*[inter[x] * n for x, n in state.items()]))
+
+    rng = random.Random(seed)
+    traces = []
+    for sample in range(1, samples + 1):
+        init = [rng.choice(signals[f]) for f in (rng.choice(starts) if starts else [])]
+        init += [rng.choice(signals[f]) for f in rng.choices(sorted(signals), 
+                                                              k = rng.randint(0, 2))]
+        state = Counter(init)
+        trace, last, mstate = [], 0, interpret(state)
+        for _ in range(steps):
+            enabled = [r for r in rxns if all(state[x] >= n for x, n in r[0].items())]
+            if not enabled:
+                break
+            R, P, rxn = rng.choice(enabled)
+            state = state - R + P
+            trace.append(rxn)
+            if not all(x in inter for x in state):
+                continue
+            nstate = interpret(state)
+            if not formal_path(moves, mstate, nstate, len(trace) - last):
+                traces.append((sorted(init), trace))
+                break
+            last, mstate = len(trace), nstate
+        if len(traces) >= max_traces:
+            break
+    if traces:
+        log.info(f'Random walk found {len(traces)} counterexamples in {sample} samples.')
+        return False, traces
+    log.info(f'Random walk found no counterexample in {samples} samples.')
+    return None, None
+
+def formal_path(moves, start, goal, depth, max_states = 10000):
+    """ Breadth-first search for a formal trajectory from start to goal.
+
+    Args:
+      moves (list[(Counter, Counter)]): The formal reactions.
+      start, goal (Counter): The initial and final formal states.
+      depth (int): The maximum number of formal reactions.
+      max_states (int, optional): Give up (and return True) if the search
+        exceeds this many states. Defaults to 10000.
+
+    Returns:
+      bool: False if goal is not reachable from start.
+    """
+    key = lambda c: tuple(sorted(c.elements()))
+    goal = key(goal)
+    level, seen = [start], {key(start)}
+    for _ in range(depth):
+        if goal in seen or len(seen) > max_states:
+            return True
+        new = []
+        for state in level:
+            for R, P in moves:
+                if all(state[x] >= n for x, n in R.items()):
+                    nstate = state - R + P
+                    if key(nstate) not in seen:
+                        seen.add(key(nstate))
+                        new.append(nstate)
+        level = new
+    return goal in seen
+
+def _verify(fcrn, icrn, formals, method, interpretation, samples = 1000):
+    """ Verification of irreversible CRNs, see :func:`verify`. """
+    if 'crn-bisimulation' in method:
+        v, i = crn_bisimulation_test(fcrn, 
+                                     icrn, 
+                                     formals,
+                                     interpretation = interpretation,
+                                     permissive = permissive_check(method)) 
+    elif method == 'pathway-decomposition':
+        v = pathway_decomposition_eq([fcrn, icrn], formals)
+        i = None
+    elif method == 'random-walk':
+        v, i = random_walk_test(fcrn, icrn, formals, interpretation, samples = samples)
+    elif method == 'compositional-hybrid':
+        v, i = compositional_hybrid_test(fcrn, 
                                          icrn, 
                                          formals,
-                                         interpretation = interpretation,
-                                         permissive = permissive_check) 
-        elif method == 'pathway-decomposition':
-            v = pathway_decomposition_eq([fcrn, icrn], formals)
-            i = None
-        elif method == 'compositional-hybrid':
-            v, i = compositional_hybrid_test(fcrn, 
-                                             icrn, 
-                                             formals,
-                                             interpretation)
-        elif method == 'integrated-hybrid':
-            v, i = integrated_hybrid_test(fcrn, 
-                                          icrn, 
-                                          formals,
-                                          interpretation)
-        else:
-            raise RuntimeError('Unknown verification method.')
-    except TimeoutError:
-        v, i = None, None
-    finally:
-        signal.alarm(0)
+                                         interpretation)
+    elif method == 'integrated-hybrid':
+        v, i = integrated_hybrid_test(fcrn, 
+                                      icrn, 
+                                      formals,
+                                      interpretation)
+    else:
+        raise RuntimeError('Unknown verification method.')
     return v, i
 
-def verify_modules(fcrns, icrns, formals, method, interpretation = None, timeout = 0):
-    """ Choose from different algorithms for modular CRN bisimulation. """
-    fcrns = [[list(rxn[:2]) for rxn in split_reversible_rxns(mod)] for mod in fcrns]
+def verify_modules(fcrns, icrns, formals, method, interpretation = None, timeout = 0, 
+                   memory = 0, cache = None, workers = 0, reuse = False, instrument = False):
+    """ Choose from different algorithms for modular CRN bisimulation. 
+
+    Limits are enforced in a child process, see :func:`verify`. With workers > 0
+    or reuse = True, every module is verified in its own child process instead,
+    and isomorphic modules are verified only once (see
+    :func:`verify_modules_parallel`). With instrument = True, a
+    :obj:`VerificationStats` object is returned as third element. The formal
+    modules may be :obj:`FormalCRN` objects.
+    """
+    start = time.perf_counter()
+    stats = VerificationStats(f'modular-{method}')
+    fcrns = [FormalCRN.prepare(mod, formals).crn for mod in fcrns]
     icrns = [[list(rxn[:2]) for rxn in split_reversible_rxns(mod)] for mod in icrns]
+    stats.size = stats.reduced_size = tuple(map(sum, zip(*map(crn_size, icrns))))
+    if workers > 0 or reuse:
+        run = lambda: verify_modules_parallel(fcrns, icrns, formals, method, 
+                                              interpretation, timeout = timeout, 
+                                              memory = memory, workers = workers,
+                                              cache = cache, stats = stats)
+    else:
+        run = lambda: run_with_limits(_verify_modules, 
+                                      (fcrns, icrns, formals, method, interpretation),
+                                      timeout = timeout, memory = memory, stats = stats)
+    hits = cache.hits if cache is not None else 0
+    v, i = cached_run(cache, f'modular-{method}', fcrns + icrns, formals, interpretation, run)
+    if cache is not None:
+        stats.cached = cache.hits > hits
+    stats.wall_time = time.perf_counter() - start
+    return (v, i, stats) if instrument else (v, i)
+
+def _verify_modules(fcrns, icrns, formals, method, interpretation):
+    """ Modular verification of irreversible CRNs, see :func:`verify_modules`. """
+    if 'crn-bisimulation' in method:
+        v, i = modular_crn_bisimulation_test(fcrns, 
+                                             icrns, 
+                                             formals,
+                                             interpretation = interpretation, 
+                                             permissive = permissive_check(method))
+    else:
+        raise RuntimeError('Unsupported verification method.')
+    return v, i
+
+def verify_modules_parallel(fcrns, icrns, formals, method, interpretation = None, 
+                            timeout = 0, memory = 0, workers = 0, cache = None, 
+                            stats = None):
+    """ Modular CRN bisimulation with one child process per module.
+
+    This is the same test as crnverifier's modular_crn_bisimulation_test:
+    every shared implementation species must be part of the partial
+    interpretation, so the bisimulation of one module does not depend on the
+    bisimulations of the other modules. Modules are verified concurrently
+    under a shared deadline, and all processes are stopped as soon as one
+    module is not correct. Modules with the same formal CRN, implementation
+    CRN, partial interpretation and shared species up to a renaming of
+    species (see :func:`verification_key`) are verified only once.
+
+    Args:
+      fcrns (list): Irreversible formal CRN modules.
+      icrns (list): Irreversible implementation CRN modules, there may be one
+        more implementation module than formal modules (crosstalk).
+      formals, method, interpretation, timeout, memory: See :func:`verify`.
+      workers (int, optional): The maximum number of concurrent processes.
+        Defaults to 0, i.e. one process for every CPU.
+      cache (:obj:`VerificationCache`, optional): Look up and store the
+        result of every class of isomorphic modules. Defaults to None.
+      stats (:obj:`VerificationStats`, optional): Record the number of 
+        module classes and the search counters. Defaults to None.
+
+    Returns:
+      [bool, dict]: The combined verdict and interpretation.
+    """
+    if 'crn-bisimulation' not in method:
+        raise RuntimeError('Unsupported verification method.')
+    inter = dict(interpretation) if interpretation else dict()
+    species = lambda crn: set().union(*[set().union(*rxn[:2]) for rxn in crn])
+
+    # The modules in which every implementation and formal species appears.
+    ispc, fspc = dict(), dict()
+    for e, module in enumerate(icrns, 1):
+        for isp in species(module):
+            ispc.setdefault(isp, []).append(e)
+    for e, module in enumerate(fcrns, 1):
+        for fsp in species(module):
+            fspc.setdefault(fsp, []).append(e)
+    if len(fcrns) == len(icrns) - 1:
+        # All reactions of the extra module must interpret to trivial
+        # reactions, except for reactions of interpreted species.
+        fcrns = fcrns + [[]]
+        for fsp in set().union(*[set(inter.get(isp, [])) for isp in species(icrns[-1])]):
+            fspc.setdefault(fsp, []).append(len(fcrns))
+
+    # Modules which are identical up to a renaming of (formal and
+    # implementation) species are verified only once.
+    tasks, classes, names = dict(), dict(), dict()
+    for e, (fcrn, icrn) in enumerate(zip(fcrns, icrns), 1):
+        mfs = {k for k in formals if e in fspc.get(k, [])}
+        minter = {k: v for k, v in inter.items() if e in ispc.get(k, [])}
+        fsc = {f for f, m in fspc.items() if e in m and len(m) > 1}
+        isc = {i for i, m in ispc.items() if e in m and len(m) > 1}
+        if not all(i in minter for i in isc):
+            raise NotImplementedError('Modular CRN bisimulation: ' + \
+                f'please provide an interpretation for all shared implementation species: {isc}')
+        key, names[e] = verification_key(f'module-{method}', [fcrn, icrn], mfs, minter, 
+                                         marks = (isc, fsc), rename_formals = True)
+        classes.setdefault(key, []).append(e)
+        if len(classes[key]) == 1:
+            tasks[key] = (_verify_module, 
+                          (fcrn, icrn, mfs, minter, isc, fsc, permissive_check(method)))
+    if stats is not None:
+        stats.parts = len(tasks)
+    if len(tasks) < len(fcrns):
+        log.info(f'Verifying {len(tasks)} classes of isomorphic modules ' + \
+                 f'instead of {len(fcrns)} modules.')
 
-    signal.signal(signal.SIGALRM, handler)
-    signal.alarm(timeout)
+    def unfold(key, bisim):
+        # The interpretation of every module in the class.
+        canonical = rename_interpretation(bisim, names[classes[key][0]])
+        for e in classes[key]:
+            yield rename_interpretation(canonical, {v: k for k, v in names[e].items()})
+
+    known = []
+    for key in list(tasks) if cache is not None else []:
+        result = cache.get(key, names[classes[key][0]])
+        if result is not None:
+            del tasks[key]
+            known.append((key, True, tuple(result), 0))
+
+    times, errors, counters = dict(), [], dict()
+    results = run_concurrently(tasks, timeout = timeout, memory = memory, 
+                               workers = workers, counters = counters)
     try:
-        if 'crn-bisimulation' in method:
-            if method[-2:] == '-ls':
-                permissive_check = 'loopsearch'
-            elif method[-2:] == '-bf':
-                permissive_check = 'bruteforce'
-            else:
-                permissive_check = 'graphsearch'
-            v, i = modular_crn_bisimulation_test(fcrns, 
-                                                 icrns, 
-                                                 formals,
-                                                 interpretation = interpretation, 
-                                                 permissive = permissive_check)
-        else:
-            raise RuntimeError('Unsupported verification method.')
-    except TimeoutError:
-        v, i = None, None
+        for key, success, result, seconds in chain(known, results):
+            e = classes[key][0]
+            times[e] = seconds
+            if not success:
+                # Raised only if no other module fails.
+                errors.append(result)
+                continue
+            v, bisim = result
+            if cache is not None and key in tasks:
+                cache.put(key, names[e], v, bisim)
+            if v is not True:
+                log.info(f'Module {e} verification result: {v}. Stopping all modules.')
+                return v, None
+            for mbisim in unfold(key, bisim):
+                inter.update(mbisim)
     finally:
-        signal.alarm(0)
-    return v, i
+        results.close()
+        for c in counters.values() if stats is not None else []:
+            stats.count(c)
+        slowest = sorted(times.items(), key = lambda x: -x[1])[:3]
+        log.info('Slowest module verifications: ' + \
+                ', '.join(f'module {e} ({t:.2f} s)' for e, t in slowest))
+    if errors:
+        raise errors[0]
+    return True, inter
+
+def _verify_module(fcrn, icrn, formals, interpretation, isc, fsc, permissive):
+    """ Bisimulation of one module, see :func:`verify_modules_parallel`. """
+    for bisim in crn_bisimulations(fcrn, icrn, 
+                                   interpretation = interpretation, 
+                                   formals = formals, 
+                                   permissive = permissive):
+        if passes_modularity_condition(bisim, icrn, isc, fsc):
+            return True, bisim
+        log.debug(f'Skipping non-modular bisimulation: {bisim}')
+    return False, None
+
+def permissive_check(method):
+    """ The permissive check of a crn-bisimulation method name. """
+    if method[-2:] == '-ls':
+        return 'loopsearch'
+    elif method[-2:] == '-bf':
+        return 'bruteforce'
+    return 'graphsearch'
@@ -0,0 +1,253 @@
+#
+#  nuskell/dsdanalysis.py
+#  NuskellCompilerProject
+#
+# Static analysis of DSD systems prior to reaction enumeration.
+#
+import logging
+log = logging.getLogger(__name__)
+
+from math import prod, factorial
+from itertools import chain, groupby, product, permutations
+from collections import deque
+from dsdobjects.complex_utils import rotate_complex_once
+
+def exposed_domains(cplx):
+    """ Unpaired domains in the exterior loop of a complex.
+
+    Returns:
+        list[(loc, domain)]: The location and domain object of exposed domains.
+    """
+    return [(loc, cplx.get_domain(loc)) for loc in cplx.exterior_domains]
+
+def complementarity_index(complexes):
+    """ Index of complexes by their exposed domains.
+
+    Args:
+        complexes (dict[name] = obj): The complexes of a DSD system.
+
+    Returns:
+        dict[domain.name] = list[(cplx.name, loc)]: Every location in a complex
+            where the domain is exposed.
+    """
+    index = dict()
+    for cplx in complexes.values():
+        for loc, dom in exposed_domains(cplx):
+            index.setdefault(dom.name, []).append((cplx.name, loc))
+    return index
+
+def polymerization_risk(complexes):
+    """ Find complexes that may bind into chains of unbounded length.
+
+    Every exposed domain is a binding site, which can bind the complementary
+    exposed domain of another copy of any complex. A chain of complexes can
+    grow without bounds, if it is possible to enter a complex via one binding
+    site and leave it via a different binding site, such that the same complex
+    is eventually entered again via the same site. Complexes exposing
+    complementary domains (e.g. t1 and t1*) are the simplest example.
+
+    This is a necessary-condition heuristic on the initial complexes only:
+    polymers which emerge from reaction products are not detected, and not
+    every flagged chain is actually formed during reaction enumeration.
+
+    Args:
+        complexes (dict[name] = obj): The complexes of a DSD system.
+
+    Returns:
+        list[str]: The names of complexes that can be part of an unbounded chain.
+    """
+    index = complementarity_index(complexes)
+    sites = {name: exposed_domains(cplx) for name, cplx in complexes.items()}
+
+    def successors(state):
+        # Leave a complex through any site but the one used to enter it.
+        name, entry = state
+        for loc, dom in sites[name]:
+            if loc == entry:
+                continue
+            yield from index.get(dom.cname, [])
+
+    risky = set()
+    for name in complexes:
+        for loc, _ in sites[name]:
+            # Is the state (name, loc) reachable from itself?
+            start = (name, loc)
+            seen = set()
+            queue = deque(successors(start))
+            while queue:
+                state = queue.popleft()
+                if state == start:
+                    risky.add(name)
+                    break
+                if state in seen:
+                    continue
+                seen.add(state)
+                queue.extend(successors(state))
+            if name in risky:
+                break
+    return sorted(risky)
+
+def independent_subsystems(complexes):
+    """ Partition complexes into subsystems which can never interact.
+
+    Two complexes belong to the same subsystem if one of them contains a
+    domain (paired or unpaired) that is complementary to a domain of the
+    other. Strands of different subsystems can never bind to each other, so
+    the reaction network of the full system is the union of the reaction
+    networks of its subsystems.
+
+    Args:
+        complexes (dict[name] = obj): The complexes of a DSD system.
+
+    Returns:
+        list[dict[name] = obj]: The subsystems, in order of their first
+            complex in the input dictionary.
+    """
+    parent = {name: name for name in complexes}
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    containing, complement = dict(), dict()
+    for name, cplx in complexes.items():
+        for dom in cplx.domains:
+            containing.setdefault(dom.name, []).append(name)
+            complement[dom.name] = dom.cname
+    for dname, names in containing.items():
+        partners = containing.get(complement[dname], [])
+        if not partners:
+            continue
+        root = find(names[0])
+        for other in chain(names, partners):
+            parent[find(other)] = root
+
+    subsystems = dict()
+    for name, cplx in complexes.items():
+        subsystems.setdefault(find(name), dict())[name] = cplx
+    return list(subsystems.values())
+
+
+def crosstalk_candidates(modules):
+    """ Bimolecular interactions between complexes of different modules.
+
+    Two complexes may interact if one of them exposes a domain and the other
+    one exposes its complement (see :func:`complementarity_index`). Such an
+    interaction is a crosstalk candidate, if there is no module containing
+    both complexes. An empty list only certifies that none of the given
+    complexes of one module can bind to a given complex of another module.
+
+    The modules may be the modules from translate(), which contain only the
+    initial complexes: intermediates and wastes can expose domains that are
+    hidden in the initial complexes, so their interactions are not covered.
+    The module networks from :func:`nuskell.dsdenumerator.enumerate_modules`
+    (or derive_modules) include the intermediate and waste complexes of
+    every module.
+
+    Args:
+        modules (list[dict[name] = obj]): The complexes of every module.
+
+    Returns:
+        list[(str, str, str)]: Two complex names and the domain exposed by the
+            first complex, which is complementary to a domain of the second.
+    """
+    membership, complexes = dict(), dict()
+    for e, module in enumerate(modules):
+        for name, cplx in module.items():
+            membership.setdefault(name, set()).add(e)
+            complexes[name] = cplx
+    index = complementarity_index(complexes)
+
+    candidates = set()
+    for name, cplx in complexes.items():
+        for loc, dom in exposed_domains(cplx):
+            for other, _ in index.get(dom.cname, []):
+                if membership[name] & membership[other]:
+                    continue
+                if name < other:
+                    candidates.add((name, other, dom.name))
+                else:
+                    candidates.add((other, name, dom.cname))
+    return sorted(candidates)
+
+def rotations(sequence, structure):
+    """ All strand rotations of a complex given as sequence and structure.
+
+    Yields:
+        (tuple, tuple): The sequence and structure of every rotation, starting
+            with the input itself.
+    """
+    seq, sst = list(sequence), list(structure)
+    for _ in range(seq.count('+') + 1):
+        yield tuple(seq), tuple(sst)
+        seq, sst = rotate_complex_once(seq, sst)
+
+def canonical_form(sequence, structure):
+    """ The canonical form of a complex given as sequence and structure.
+
+    This is the same (rotation invariant) canonical form as the one used for
+    complex objects, i.e. the lexicographically smallest strand rotation.
+    """
+    return min(rotations(sequence, structure))
+
+def module_shape(complexes, max_orders = 720):
+    """ A canonical relabelling of the domains of a set of complexes.
+
+    Complexes are sorted by a signature which does not depend on names: the
+    length and orientation of every domain together with the structure of
+    the smallest such strand rotation. Domains are then relabelled in order
+    of their first occurrence (x and x* share a label). Two sets of complexes
+    with the same shape are identical up to a renaming of domains, which
+    means that they have isomorphic reaction networks. Complexes with equal
+    signatures are relabelled in every possible order and the smallest shape
+    is used. If there are too many orders, ties are broken by name, which can
+    only cause different shapes for isomorphic systems, never the same shape
+    for different systems.
+
+    Args:
+        complexes (dict[name] = obj): The complexes of a DSD system.
+        max_orders (int, optional): The maximum number of orders of complexes
+            to try. Defaults to 720.
+
+    Returns:
+        [tuple, dict]: The shape, i.e. the relabelled sequence and structure
+            of every complex and the length of every label, and the relabelling
+            of domain names (without complement).
+    """
+    lengths = dict()
+    signatures = []
+    for name, cplx in complexes.items():
+        for dom in cplx.domains:
+            lengths[dom.name] = lengths[dom.name.rstrip('*')] = dom.length
+        seq, sst = cplx.canonical_form
+        # Strand breaks are (0, False), domains have a positive length.
+        sig, rot = min(((tuple((0, False) if d == '+' else (lengths[d], d[-1] == '*')
+                                    for d in rseq), rsst), rseq)
+                        for rseq, rsst in rotations(seq, sst))
+        signatures.append((sig, name, rot))
+    signatures.sort()
+
+    # Complexes with equal signatures can be listed in any order. Try all
+    # orders (up to max_orders) and use the one with the smallest shape.
+    groups = [list(g) for _, g in groupby(signatures, key = lambda x: x[0])]
+    if prod(factorial(len(g)) for g in groups) > max_orders:
+        orders = [signatures]
+    else:
+        orders = (list(chain(*o)) for o in product(*map(permutations, groups)))
+
+    def relabelled(order):
+        labels = dict()
+        shape = []
+        for (_, sst), _, seq in order:
+            for d in seq:
+                if d != '+' and d.rstrip('*') not in labels:
+                    labels[d.rstrip('*')] = f'x{len(labels)}'
+            shape.append((relabel(seq, labels), sst))
+        return (tuple(shape), tuple(lengths[d] for d in labels)), labels
+    return min((relabelled(order) for order in orders), key = lambda x: x[0])
+
+def relabel(sequence, labels):
+    """ Rename the domains of a sequence (see :func:`module_shape`). """
+    return tuple(d if d == '+' else 
+                 labels[d[:-1]] + '*' if d[-1] == '*' else labels[d] for d in sequence)
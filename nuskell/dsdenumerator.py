@@ -9,65 +9,741 @@
 import logging
 log = logging.getLogger(__name__)
 
+import os
+import re
 import gc
+import collections
+import json
+import time
+import threading
+import multiprocessing
+from contextlib import contextmanager
 from itertools import chain
-from peppercornenumerator import enumerate_pil
-from peppercornenumerator.enumerator import UNI_REACTIONS
-from peppercornenumerator.reactions import branch_3way, branch_4way
+from concurrent.futures import ProcessPoolExecutor
+from dsdobjects import ComplexS
+from peppercornenumerator import Enumerator, PolymerizationError
+from peppercornenumerator.input import read_pil
+from peppercornenumerator.objects import PepperComplex
+from peppercornenumerator.enumerator import UNI_REACTIONS, segment_neighborhood
+from peppercornenumerator.utils import tarjans
+from peppercornenumerator.condense import PepperCondensation
+from peppercornenumerator.reactions import bind11, open1N, branch_3way, branch_4way
 
 from .ioutils import write_pil, load_pil, get_domains
+from .dsdanalysis import independent_subsystems, module_shape, relabel, canonical_form
+from .crnutils import Reaction
 from .objects import NuskellComplex, NuskellMacrostate, NuskellReaction, SingletonError
 from .objects import show_memory
 
+# Peppercorn and dsdobjects keep process-wide state: the singleton registries
+# of domains and complexes, as well as the counter used to name new complexes.
+# Enumerations are therefore serialized with this (reentrant) lock. The naming
+# prefix is only set during an enumeration (see naming_prefix), all other
+# settings are local to each call.
+ENUMERATION_LOCK = threading.RLock()
+
+# The reaction type of the reactions generated by each unimolecular move.
+MOVE_TYPES = {bind11: 'bind11',
+              open1N: 'open',
+              branch_3way: 'branch-3way',
+              branch_4way: 'branch-4way'}
+
 class DSDenumerationError(Exception):
     pass
 
+class EnumerationTimeout(DSDenumerationError):
+    """ Raised when enumeration exceeds its wall-clock budget.
+
+    The exception carries the partial (truncated) enumeration result, which
+    is consistent, but not complete: complexes and reactions have the same
+    format as the return values of :func:`enumerate_solution`.
+    """
+    def __init__(self, message, complexes = None, reactions = None):
+        super(EnumerationTimeout, self).__init__(message)
+        self.complexes = complexes
+        self.reactions = reactions
+
+class _BudgetExceeded(PolymerizationError):
+    # Peppercorn stops gracefully on PolymerizationErrors, and so we use it
+    # internally to stop the enumeration when the wall-clock budget is over.
+    pass
+
+class EnumerationConfig:
+    """ Settings for a single call to the peppercorn enumerator.
+
+    The attribute names correspond to the destinations of the nuskell command
+    line arguments, so an argparse.Namespace and an EnumerationConfig can be
+    used interchangeably. A new config object is derived for every call of
+    :func:`enumerate_solution`, which makes sure that changes to the arguments
+    (e.g. from another thread) do not affect a running enumeration.
+
+    Do NOT change default values here. These are supposed to be the defaults
+    of peppercorn!
+    """
+    DEFAULTS = {'max_complex_size': 10,
+                'max_complex_count': 10_000,
+                'max_reaction_count': 50_000,
+                'reject_remote': False,
+                'ignore_branch_3way': False,
+                'ignore_branch_4way': False,
+                'release_cutoff_1_1': 9,
+                'release_cutoff_1_2': 9,
+                'release_cutoff': None,
+                'no_max_helix': False,
+                'enum_detailed': False,
+                'k_slow': 0.0,
+                'k_fast': 0.0,
+                'enum_timeout': 0,
+                'enum_workers': 1,
+                'partition': False,
+                'enum_low_memory': False,
+                'enum_backend': 'peppercorn',
+                'progress': None,
+                'checkpoint': None,
+                'checkpoint_interval': 300,
+                'resume': False,
+                'move_cache': None}
+
+    def __init__(self, **kwargs):
+        for k, v in self.DEFAULTS.items():
+            setattr(self, k, kwargs.pop(k, v))
+        if kwargs:
+            raise DSDenumerationError(f'Unknown enumeration settings: {sorted(kwargs)}')
+
+    @classmethod
+    def from_args(cls, args):
+        """ Copy all enumeration settings from an argparse.Namespace (or similar). """
+        return cls(**{k: getattr(args, k) for k in cls.DEFAULTS if hasattr(args, k)})
+
+    def copy(self, **kwargs):
+        """ Returns a new config object, updated with the given settings. """
+        data = {k: getattr(self, k) for k in self.DEFAULTS}
+        data.update(kwargs)
+        return self.__class__(**data)
+
+    @property
+    def uni_reactions(self):
+        """ list: The unimolecular reaction moves for this enumeration. """
+        moves = list(UNI_REACTIONS)
+        if self.ignore_branch_3way:
+            moves.remove(branch_3way)
+        if self.ignore_branch_4way:
+            moves.remove(branch_4way)
+        return moves
+
+    def peppercorn_kwargs(self):
+        """ dict: Attributes of the :obj:`NuskellEnumerator` object. """
+        kwargs = dict()
+        kwargs['max_complex_size'] = self.max_complex_size
+        kwargs['max_complex_count'] = self.max_complex_count
+        kwargs['max_reaction_count'] = self.max_reaction_count
+        kwargs['reject_remote'] = self.reject_remote
+        kwargs['max_helix'] = not self.no_max_helix
+        kwargs['uni_reactions'] = self.uni_reactions
+        if self.ignore_branch_3way:
+            log.info('No 3-way branch migration.')
+        if self.ignore_branch_4way:
+            log.info('No 4-way branch migration.')
+        kwargs['release_cutoff_1_1'] = self.release_cutoff_1_1
+        kwargs['release_cutoff_1_2'] = self.release_cutoff_1_2
+        if self.release_cutoff:
+            kwargs['release_cutoff'] = self.release_cutoff
+        kwargs['k_slow'] = self.k_slow
+        kwargs['k_fast'] = self.k_fast
+        if self.enum_timeout:
+            kwargs['timeout'] = self.enum_timeout
+        if self.progress:
+            kwargs['progress'] = self.progress
+        if self.checkpoint:
+            kwargs['checkpoint'] = self.checkpoint
+            kwargs['checkpoint_interval'] = self.checkpoint_interval
+        if self.move_cache is not None:
+            kwargs['move_cache'] = self.move_cache
+        return kwargs
+
+class NuskellEnumerator(Enumerator):
+    """ A peppercorn Enumerator with its own set of unimolecular reaction moves.
+
+    Peppercorn looks up the reaction moves in the global list UNI_REACTIONS,
+    this object uses the attribute uni_reactions instead. That way, the global
+    state of peppercorn is never modified.
+
+    If a checkpoint file is set, the enumeration state is written to that file
+    every checkpoint_interval seconds (and when the complex or reaction limits
+    are exceeded), such that enumeration can be resumed later.
+
+    If timeout is set, the enumeration stops after (approximately) timeout
+    seconds and the attribute truncated is set to True. A progress function
+    is called after every neighborhood of fast reactions with a dictionary
+    containing the number of complexes, reactions, complexes in the queue and
+    the elapsed time.
+
+    If move_cache is a dictionary, the reactions of every complex (and of
+    every pair of complexes) are stored there and reused by all enumerators
+    sharing that dictionary. Enumerators sharing a move_cache must only differ
+    in k_slow and k_fast, the moves are stored for each release cutoff.
+    """
+    def __init__(self, *args, **kwargs):
+        super(NuskellEnumerator, self).__init__(*args, **kwargs)
+        self.uni_reactions = list(UNI_REACTIONS)
+        self.timeout = 0
+        self.progress = None
+        self.truncated = False
+        self._start_time = time.perf_counter()
+        self.checkpoint = None
+        self.checkpoint_interval = 300
+        self.checkpoint_input = None
+        self._checkpoint_time = time.perf_counter()
+        self._restored_macrostates = set()
+        self.move_cache = None
+
+    def enumerate(self):
+        self._start_time = time.perf_counter()
+        try:
+            super(NuskellEnumerator, self).enumerate()
+        except _BudgetExceeded as err:
+            log.warning(f'Enumeration truncated: {err}')
+            self.truncated = True
+        finally:
+            # Peppercorn resets the resting macrostates at the start of enumeration.
+            self._resting_macrostates |= self._restored_macrostates
+
+    def process_fast_neighborhood(self, source):
+        super(NuskellEnumerator, self).process_fast_neighborhood(source)
+        elapsed = time.perf_counter() - self._start_time
+        if self.progress is not None:
+            self.progress({'complexes': len(self._E) + len(self._S) + len(self._T),
+                           'reactions': len(self._reactions),
+                           'queue': len(self._B) + len(self._S),
+                           'elapsed': elapsed})
+        timeout = bool(self.timeout) and elapsed > self.timeout
+        if self.checkpoint is not None:
+            # Peppercorn checks these limits before processing the next neighborhood.
+            exceeded = len(self._E) + len(self._T) + len(self._S) > self._max_complex_count \
+                        or len(self._reactions) > self._max_reaction_count
+            if exceeded or timeout or \
+                    time.perf_counter() - self._checkpoint_time >= self.checkpoint_interval:
+                self.write_checkpoint(self.checkpoint)
+        if timeout:
+            raise _BudgetExceeded(f'Enumeration time exceeded {self.timeout} seconds.')
+
+    def write_checkpoint(self, filename):
+        """ Write the current enumeration state into a (JSON) checkpoint file.
+
+        The complexes and detailed reactions are stored in PIL format, the
+        lists of the enumeration algorithm are stored by complex name.
+        """
+        cplxs = set(chain(self._E, self._S, self._T, self._B))
+        domains = set(d for cx in cplxs for d in cx.domains)
+        pil = []
+        for dom in sorted(set(~d if d.is_complement else d for d in domains), 
+                          key = lambda d: d.name):
+            pil.append(f"length {dom.name} = {len(dom)}")
+        for cx in sorted(cplxs, key = lambda c: c.name):
+            pil.append(f"{cx.name} = {cx.kernel_string}")
+        for rxn in sorted(self._reactions, key = lambda r: r.name):
+            pil.append("reaction [{} = {!r} {}] {} -> {}".format(
+                rxn.rtype, rxn._const, rxn._units,
+                ' + '.join(x.name for x in rxn.reactants),
+                ' + '.join(x.name for x in rxn.products)))
+        data = {'input': self.checkpoint_input,
+                'pil': '\n'.join(pil) + '\n',
+                'E': [x.name for x in self._E],
+                'S': [x.name for x in self._S],
+                'T': [x.name for x in self._T],
+                'B': [x.name for x in self._B]}
+        with open(filename + '.tmp', 'w') as fh:
+            json.dump(data, fh)
+        os.replace(filename + '.tmp', filename)
+        self._checkpoint_time = time.perf_counter()
+        log.info(f'Wrote enumeration checkpoint {filename}: ' + \
+                 f'{len(cplxs)} complexes, {len(self._reactions)} reactions.')
+
+    def restore_checkpoint(self, data):
+        """ Restore the enumeration state from the data of a checkpoint file. """
+        cxs, rxns = read_pil(data['pil'])
+        cxs = {k: v for k, v in cxs.items() if isinstance(k, str)}
+        self._E = [cxs[x] for x in data['E']]
+        self._S = [cxs[x] for x in data['S']]
+        self._T = [cxs[x] for x in data['T']]
+        self._B = [cxs[x] for x in data['B']]
+        self._reactions |= set(rxns)
+        # Macrostates are recovered from the fast reactions between resting complexes.
+        frxns = [r for r in self._reactions if r.arity[0] == 1 and \
+                        r.rate_constant[0] >= max(self.k_slow, self.k_fast)]
+        info = segment_neighborhood(self._E + self._S + self._T, frxns, 
+                                    represent = self.representatives)
+        self._restored_macrostates = set(info['resting_macrostates'])
+        # New complexes must not get names of restored complexes.
+        prefix = PepperComplex.PREFIX
+        for name in cxs:
+            if name.startswith(prefix) and name[len(prefix):].isdigit():
+                PepperComplex.ID = max(PepperComplex.ID, int(name[len(prefix):]) + 1)
+        log.info(f'Restored enumeration checkpoint: {len(cxs)} complexes, ' + \
+                 f'{len(self._reactions)} reactions, {len(self._B) + len(self._S)} ' + \
+                  'complexes remaining.')
+        cxs.clear()
+
+    def get_uni_reactions(self, cplx):
+        if self.move_cache is None:
+            yield from self._get_uni_reactions(cplx)
+            return
+        # The k_slow setter of peppercorn can raise the release cutoffs.
+        key = ('uni', cplx, self.release_cutoff_1_1, self.release_cutoff_1_2)
+        if key not in self.move_cache:
+            self.move_cache[key] = list(self._get_uni_reactions(cplx))
+        yield from self.move_cache[key]
+
+    def get_bi_reactions(self, cplx1, cplx2):
+        sup = super(NuskellEnumerator, self)
+        if self.move_cache is None:
+            yield from sup.get_bi_reactions(cplx1, cplx2)
+            return
+        # Binding moves are symmetric, the order of complexes does not matter.
+        key = ('bi',) + tuple(sorted((cplx1, cplx2), key = lambda x: x.name))
+        if key not in self.move_cache:
+            self.move_cache[key] = list(sup.get_bi_reactions(cplx1, cplx2))
+        yield from self.move_cache[key]
+
+    def _get_uni_reactions(self, cplx):
+        # Peppercorn applies all moves in UNI_REACTIONS, the reactions of
+        # moves which are not in self.uni_reactions are dropped.
+        rtypes = set(MOVE_TYPES[move] for move in self.uni_reactions)
+        for rxn in super(NuskellEnumerator, self).get_uni_reactions(cplx):
+            if rxn.rtype in rtypes:
+                yield rxn
+
+class ScreeningEnumerator(NuskellEnumerator):
+    """ A NuskellEnumerator which screens pairs of complexes before binding.
+
+    Most pairs of complexes in strand displacement systems cannot bind to each
+    other. Before the bimolecular reaction moves of peppercorn are applied to
+    a pair of complexes, this enumerator checks whether one complex exposes a
+    domain complementary to an exposed domain of the other complex, using only
+    the names of domains. Condensation uses an index of reactions by reactant
+    (see :obj:`IndexedCondensation`).
+
+    This is not a separate enumerator: all reactions are computed by
+    peppercorn, and the enumerated network is the same as the one of
+    :obj:`NuskellEnumerator`.
+    """
+    def __init__(self, *args, **kwargs):
+        super(ScreeningEnumerator, self).__init__(*args, **kwargs)
+        self._exposed_names = dict()
+
+    def clear(self):
+        super(ScreeningEnumerator, self).clear()
+        self._exposed_names.clear()
+
+    def exposed_names(self, cplx):
+        """ Names of exposed domains and of their complements.
+
+        Returns:
+            (set, set): exposed domain names, complements of exposed domain names.
+        """
+        if cplx.name not in self._exposed_names:
+            exposed = set(cplx.get_domain(loc).name for loc in cplx.exterior_domains)
+            self._exposed_names[cplx.name] = (exposed, set(map(complement_name, exposed)))
+        return self._exposed_names[cplx.name]
+
+    def condense(self):
+        self.condensation = IndexedCondensation(self)
+        self.condensation.condense()
+
+    def get_bi_reactions(self, cplx1, cplx2):
+        exposed, _ = self.exposed_names(cplx1)
+        _, cexposed = self.exposed_names(cplx2)
+        if exposed & cexposed:
+            yield from super(ScreeningEnumerator, self).get_bi_reactions(cplx1, cplx2)
+
+class IndexedCondensation(PepperCondensation):
+    """ PepperCondensation with a single pass to find the reactions of every complex.
+
+    Peppercorn tests every reaction for every complex, which is quadratic in
+    the size of the network. Only the initialization differs from
+    PepperCondensation, the rest of the condensation is unchanged.
+    """
+    def __init__(self, enumerator):
+        # Same as PepperCondensation.__init__, except for reactions_consuming.
+        self.enumerator = enumerator
+        self.reactions_consuming = get_reactions_consuming(self.complexes, 
+                                                           list(self.detailed_reactions))
+        fast11_products = {c: set().union(*[r.products for r in rxns \
+                            if r.arity == (1, 1) and self.is_fast(r)]) \
+                                for (c, rxns) in self.reactions_consuming.items()}
+        self.SCCs = tarjans(list(self.complexes), fast11_products)
+        self.scc_containing = {c: scc for scc in self.SCCs for c in scc}
+        self.set_to_fate = dict()
+        self._complex_fates = dict()
+        self._condensed_reactions = None
+        self.stationary_dist = dict()
+        self.cplx_decay_prob = collections.defaultdict(float)
+        self.exit_prob = dict()
+        self.reaction_decay_prob = collections.defaultdict(float)
+
+def get_reactions_consuming(complexes, reactions):
+    """ dict: maps complexes to lists of reactions where they appear as a reactant. """
+    consuming = {c: [] for c in complexes}
+    for r in reactions:
+        for c in set(r.reactants):
+            if c in consuming:
+                consuming[c].append(r)
+    return consuming
+
+def complement_name(name):
+    """ str: The name of the complementary domain. """
+    return name[:-1] if name[-1] == '*' else name + '*'
+
+# The reaction enumerator classes available to enumerate_pil.
+ENUMERATORS = {'peppercorn': NuskellEnumerator,
+               'screened': ScreeningEnumerator}
+
+@contextmanager
+def naming_prefix(prefix):
+    """ Set the prefix used by peppercorn to name new complexes within a context.
+
+    The caller must hold the ENUMERATION_LOCK.
+    """
+    # PepperComplex names new complexes using the class attribute PREFIX, there
+    # is no setting per enumerator. This is the only global of peppercorn which
+    # is modified, and it is restored when the context is left.
+    previous = PepperComplex.PREFIX
+    PepperComplex.PREFIX = prefix
+    try:
+        yield
+    finally:
+        PepperComplex.PREFIX = previous
+
+def enumerate_pil(pilstring, kwargs, detailed = True, condensed = False,
+                  complex_prefix = 'e', enumconc = 'nM', resume = False, release = False,
+                  backend = 'peppercorn'):
+    """ Enumerate a pilstring using the :obj:`NuskellEnumerator`.
+
+    The arguments are those of peppercornenumerator.enumerate_pil(), but that
+    function always uses the peppercorn Enumerator class. Here, the pilstring
+    is read with peppercorn's read_pil(), the enumerator class is chosen by
+    backend, and the output is written with Enumerator.to_pil(). The caller
+    must hold the ENUMERATION_LOCK.
+
+    If resume is True, then the enumeration continues from the state stored in
+    kwargs['checkpoint']. The checkpoint must have been written for the same
+    pilstring, but enumeration limits may be different.
+
+    If the enumeration exceeds kwargs['timeout'], then the output string
+    contains the truncated network and the attribute truncated of the returned
+    Enumerator-object is True.
+
+    The backend is the name of an enumerator class in ENUMERATORS, i.e. the
+    peppercorn enumerator ('peppercorn') or the peppercorn enumerator with
+    screening of bimolecular reaction moves ('screened').
+
+    If release is True, then the enumerated objects are released as soon as
+    the output string has been written. The returned Enumerator-object is
+    empty, only its attribute truncated remains meaningful.
+
+    Returns:
+        Enumerator-object, Outputstring
+    """
+    if backend not in ENUMERATORS:
+        raise DSDenumerationError(f'Unknown enumerator backend: {backend}')
+    cxs, rxns = read_pil(pilstring)
+    enum = ENUMERATORS[backend](
+            [x for x in cxs.values() if x.concentration is None or x.concentration[1] != 0],
+            rxns, named_complexes = list(cxs.values()))
+    for k, w in kwargs.items():
+        if hasattr(enum, k):
+            setattr(enum, k, w)
+        else:
+            raise DSDenumerationError(f'No Enumerator attribute called: {k}')
+    enum.checkpoint_input = pilstring
+
+    with naming_prefix(complex_prefix):
+        try:
+            if resume:
+                if not enum.checkpoint or not os.path.exists(enum.checkpoint):
+                    raise DSDenumerationError(
+                            f'Cannot resume: no checkpoint file {enum.checkpoint}.')
+                with open(enum.checkpoint) as fh:
+                    data = json.load(fh)
+                if data['input'] != pilstring:
+                    raise DSDenumerationError(
+                            f'Checkpoint {enum.checkpoint} belongs to a different system.')
+                enum.restore_checkpoint(data)
+                data.clear()
+            enum.enumerate()
+        except PolymerizationError as err:
+            if enum.checkpoint:
+                log.error(f'Enumeration state is saved in {enum.checkpoint}, ' + \
+                           'increase the limits and resume to continue.')
+            cxs.clear()
+            rxns.clear()
+            enum.clear()
+            gc.collect()
+            raise err
+
+    outstring = enum.to_pil(None, detailed = detailed, condensed = condensed, 
+                            molarity = enumconc)
+    if release:
+        cxs.clear()
+        rxns.clear()
+        enum.clear()
+        enum.condensation = None
+        gc.collect()
+    return enum, outstring
+
+def replaced_species(interpretation):
+    """ Reverse index of the interpretation for history-replaced species.
+
+    Returns:
+        dict[formal] = list[impl.name]: e.g. {'A': ['A_1_', 'A_2_']}
+    """
+    # k, v = A_1_, [A]
+    replaced = dict()
+    for k, v in interpretation.items():
+        for fs in v:
+            if k != fs:
+                replaced.setdefault(fs, []).append(k)
+    return replaced
+
+def crosstalk_module(reactions, seen):
+    """ The module of all reactions which are not part of any other module. """
+    assert set(reactions).issuperset(seen)
+    mr = set(reactions) - seen
+    mc = {x.name: x for rxn in mr for x in chain(rxn.reactants, rxn.products)}
+    return mc, mr
+
+def derive_modules(modules, interpretation, complexes, reactions):
+    """ Derive module networks from the enumerated network of the full system.
+
+    This is an alternative to :func:`enumerate_modules`, which avoids a
+    separate enumeration for every module. Starting from the signal and fuel
+    species of a module (with history-replaced signal species), a module
+    contains all reactions whose reactants are reachable from those species.
+    The remaining reactions form the crosstalk module.
+
+    Args:
+        modules (list[dict]): The modules as returned from translate().
+        interpretation (dict): The interpretation from :func:`interpret_species`.
+        complexes (dict[name] = obj): All complexes of the enumerated system.
+        reactions (list[obj]): All reactions of the enumerated system.
+
+    Returns:
+        list[dict]: complexes of every module 
+        list[set]: reactions of every module
+    """
+    replaced = replaced_species(interpretation)
+    # Reactions indexed by their (distinct) reactants.
+    consuming = dict()
+    for rxn in reactions:
+        for x in set(r.name for r in rxn.reactants):
+            consuming.setdefault(x, []).append(rxn)
+
+    seen = set()
+    mcomplexes, mreactions = [], []
+    for e, module in enumerate(modules, 1):
+        start = set()
+        for name in module:
+            start.update(n for n in replaced.get(name, [name]) if n in complexes)
+        # Restricted reachability: a reaction is part of the module once all
+        # of its reactants have been reached.
+        missing = dict()
+        reached, queue, mr = set(start), list(start), set()
+        while queue:
+            x = queue.pop()
+            for rxn in consuming.get(x, []):
+                if rxn not in missing:
+                    missing[rxn] = len(set(r.name for r in rxn.reactants))
+                missing[rxn] -= 1
+                if missing[rxn] == 0:
+                    mr.add(rxn)
+                    for p in rxn.products:
+                        if p.name not in reached:
+                            reached.add(p.name)
+                            queue.append(p.name)
+        mc = {x: complexes[x] for x in reached}
+        log.debug(f'Module {e}:\n' + write_pil(mc, mr))
+        mcomplexes.append(mc)
+        mreactions.append(mr)
+        seen |= mr
+        missing.clear()
+
+    mc, mr = crosstalk_module(reactions, seen)
+    if len(mr):
+        log.debug(f'Module (crosstalk):\n' + write_pil(mc, mr))
+        mcomplexes.append(mc)
+        mreactions.append(mr)
+    seen.clear()
+    consuming.clear()
+    return mcomplexes, mreactions
+
+def enumerate_crosstalk(candidates, complexes, args, prefix = 'x'):
+    """ Enumerate candidate crosstalk interactions between modules.
+
+    Every pair of complexes from :func:`nuskell.dsdanalysis.crosstalk_candidates`
+    is enumerated separately, which is usually much cheaper than enumerating
+    all modules. Complexes keep their names from the complexes dictionary.
+
+    Args:
+        candidates (list[(str, str, str)]): Candidate interactions.
+        complexes (dict[name] = obj): All complexes of the system.
+        args (argparse.Namespace, EnumerationConfig): Enumeration settings.
+        prefix (str, optional): Prefix of new complex names. Defaults to 'x'.
+
+    Returns:
+        set[obj]: Reactions consuming both complexes of a candidate pair.
+    """
+    args = EnumerationConfig.from_args(args).copy(checkpoint = None, 
+                                                  resume = False,
+                                                  progress = None)
+    crosstalk = set()
+    for x, y in sorted(set((x, y) for x, y, _ in candidates)):
+        pair = {x: complexes[x], y: complexes[y]}
+        _, reactions = enumerate_solution(pair, args, named = complexes, prefix = prefix)
+        for rxn in reactions:
+            if set(r.name for r in rxn.reactants) == {x, y}:
+                crosstalk.add(rxn)
+        pair.clear()
+        reactions.clear()
+    log.info(f'Found {len(crosstalk)} crosstalk reactions for {len(candidates)} candidates.')
+    return crosstalk
+
+def module_network(complexes, reactions, labels):
+    """ A name-independent representation of a module network.
+
+    Args:
+        complexes (dict[name] = obj): The complexes of the module network.
+        reactions (set[obj]): The reactions of the module network.
+        labels (dict[str] = str): The domain relabelling of the module.
+
+    Returns:
+        [list, list]: The relabelled sequence and structure of every complex,
+            and the reactant indices, product indices and type of every reaction.
+    """
+    index = {name: e for e, name in enumerate(complexes)}
+    forms = [(relabel(cx.canonical_form[0], labels), cx.canonical_form[1]) 
+                for cx in complexes.values()]
+    rxns = [(tuple(index[x.name] for x in rxn.reactants),
+             tuple(index[x.name] for x in rxn.products), rxn.rtype) for rxn in reactions]
+    return forms, rxns
+
+def rename_module(cached, labels, canonical, network):
+    """ The network of a module, from the cached network of an isomorphic module.
+
+    Args:
+        cached ([list, list]): The output of :func:`module_network`.
+        labels (dict[str] = str): The domain relabelling of the module.
+        canonical (dict[canonical_form] = obj): Complexes of the solution.
+        network (dict[canonical_form] = obj): Reactions of the full network.
+
+    Returns:
+        [dict, set]: The module complexes and reactions, or (None, None) if
+            some complex or reaction is not part of the full network.
+    """
+    names = {v: k for k, v in labels.items()}
+    forms, rxns = cached
+    complexes = []
+    for seq, sst in forms:
+        cplx = canonical.get(canonical_form(relabel(seq, names), sst), None)
+        if cplx is None:
+            return None, None
+        complexes.append(cplx)
+    reactions = set()
+    for reactants, products, rtype in rxns:
+        canon = (tuple(sorted(complexes[i].canonical_form for i in reactants)),
+                 tuple(sorted(complexes[i].canonical_form for i in products)), rtype)
+        if canon not in network:
+            return None, None
+        reactions.add(network[canon])
+    return {cx.name: cx for cx in complexes}, reactions
+
 def enumerate_modules(modules, interpretation, solution, reactions, args, prefix = 'm'):
     """ Enumerate all modules, but replaces wildcard species with other signal species.
+
+    Module complexes are reconciled with the complexes of the full solution
+    using a canonical-form index, and history-replaced species are looked up
+    in a reverse index of the interpretation dictionary. Both indices are
+    built once per call.
+
+    Modules with the same shape (see :func:`nuskell.dsdanalysis.module_shape`)
+    have isomorphic reaction networks, e.g. the modules of A + B -> C and 
+    D + E -> F. Only the first one is enumerated, the network of every other
+    module is obtained by renaming the domains of the cached network and
+    looking up the renamed complexes and reactions in the solution and the
+    full reaction network. If that lookup fails, the module is enumerated.
     """
+    replaced = replaced_species(interpretation)
+    # Canonical form index of all complexes in the overall solution.
+    canonical = {cx.canonical_form: cx for cx in solution.values()}
+
+    # Modules are never checkpointed, the checkpoint belongs to the full system.
+    args = EnumerationConfig.from_args(args).copy(checkpoint = None, resume = False)
+
+    # Canonical form index of all reactions in the overall network.
+    network = {rxn.canonical_form: rxn for rxn in reactions}
+    # Cached module networks of every shape.
+    shapes = dict()
+
     seen = set()
+    rectime = 0
+    reused = 0
     mcomplexes, mreactions = [], []
     for e, module in enumerate(modules, 1):
+        start = time.perf_counter()
         # first, replace history complexes with their interpretation!
         for cplx in list(module.values()):
-            for k, v in interpretation.items():
-                # k, v = A_1_, {A:1}
-                if (cplx.name in v) and k != cplx.name:
-                    newc = solution[k] 
-                    module[k] = newc
-                    if cplx.name in module:
-                        del module[cplx.name]
-                    del newc
+            for k in replaced.get(cplx.name, []):
+                module[k] = solution[k]
+                if cplx.name in module:
+                    del module[cplx.name]
             del cplx
+        rectime += time.perf_counter() - start
+
+        shape, labels = module_shape(module)
+        if shape in shapes:
+            mc, mr = rename_module(shapes[shape], labels, canonical, network)
+            if mc is not None:
+                reused += 1
+                log.debug(f'Module {e} (reused):\n' + write_pil(mc, mr))
+                mcomplexes.append(mc)
+                mreactions.append(mr)
+                seen |= set(mr)
+                del module
+                continue
+            log.debug(f'Module {e}: cannot reuse the network of an isomorphic module.')
 
         mc, mr = enumerate_solution(module, args, named = solution, prefix = prefix)
+        if shape not in shapes:
+            shapes[shape] = module_network(mc, mr, labels)
 
         # after enumeration, make sure there were no new 'm' species found.
+        start = time.perf_counter()
         for mcplx in list(mc.values()):
-            for scplx in solution.values():
-                if scplx == mcplx:
-                    if scplx.name != mcplx.name:
-                        print(f'{scplx.name}, {mcplx.name}, {prefix=}')
-                        print(f'{scplx}, {mcplx}')
-                        print(f'{e}, {list(map(str, module))=}')
-                        print(f'{interpretation=}')
-                        print(f'{list(map(str, solution))=}')
-                    assert scplx.name == mcplx.name
-                    del scplx
-                    break
-            else:
+            scplx = canonical.get(mcplx.canonical_form, None)
+            if scplx is None:
                 raise DSDenumerationError(f'Module complex {mcplx} not found in overall solution!')
-            del mcplx
+            if scplx.name != mcplx.name:
+                log.error(f'{scplx.name}, {mcplx.name}, {prefix=}')
+                log.error(f'{scplx}, {mcplx}')
+                log.error(f'{e}, {list(map(str, module))=}')
+                log.error(f'{interpretation=}')
+                log.error(f'{list(map(str, solution))=}')
+            assert scplx.name == mcplx.name
+            del scplx, mcplx
+        rectime += time.perf_counter() - start
         log.debug(f'Module {e}:\n' + write_pil(mc, mr))
         mcomplexes.append(mc)
         mreactions.append(mr)
         seen |= set(mr)
         del module
+    log.info(f'Reconciled {len(modules)} modules with the solution in {rectime:.4f} seconds.')
+    if reused:
+        log.info(f'Reused the networks of isomorphic modules for {reused} modules.')
+    canonical.clear()
+    network.clear()
+    shapes.clear()
 
-    assert set(reactions).issuperset(seen)
-    mr = set(reactions) - seen
+    mc, mr = crosstalk_module(reactions, seen)
     if len(mr):
-        mc = {x.name: x for rxn in mr for x in chain(rxn.reactants, rxn.products)}
         log.debug(f'Module (crosstalk):\n' + write_pil(mc, mr))
         mcomplexes.append(mc)
         mreactions.append(mr)
@@ -75,52 +751,317 @@ def enumerate_modules(modules, interpretation, solution, reactions, args, prefix
     return mcomplexes, mreactions
 
 def enumerate_solution(complexes, args, named = None, molarity = 'nM', prefix = 'i'):
+    """ Enumerate the reaction network of a DSD system using peppercorn.
+
+    Calls are thread-safe: all enumeration settings are copied from args into
+    an :obj:`EnumerationConfig` object at the beginning of the call, and
+    peppercorn's global state is protected by the ENUMERATION_LOCK. Complexes
+    which exist already (e.g. from a previous or concurrent enumeration) keep
+    their names.
+
+    Args:
+        complexes (dict[name] = obj): The initial complexes. New complexes
+            are added to this dictionary.
+        args (argparse.Namespace, EnumerationConfig): Enumeration settings.
+        named (dict[name] = obj, optional): Complexes which should keep their
+            names if they are enumerated. Defaults to None.
+        molarity (str, optional): Concentration units. Defaults to 'nM'.
+        prefix (str, optional): Prefix of new complex names. Defaults to 'i'.
+
+    The settings args.checkpoint and args.checkpoint_interval write the
+    enumeration state periodically to a file, args.resume continues the
+    enumeration from that file, e.g. with larger complex or reaction limits.
+    The setting args.enum_timeout is a wall-clock budget in seconds, and
+    args.progress is a function receiving progress reports during
+    enumeration, see :obj:`NuskellEnumerator`.
+
+    If args.partition is set, the complexes are split into independent
+    subsystems (see :func:`nuskell.dsdanalysis.independent_subsystems`), which
+    are enumerated separately and merged afterwards. The limits
+    args.max_complex_count and args.max_reaction_count then apply to each
+    subsystem, the time budget args.enum_timeout is shared. With
+    args.enum_workers > 1, subsystems are enumerated in separate processes.
+    Complex names are the same as with sequential enumeration.
+
+    Subsystems are converted to nuskell objects one at a time, see also
+    :func:`enumerate_reactions`. With args.enum_low_memory, every
+    intermediate result (peppercorn objects, the enumerated PIL string, the
+    parsed PIL file) is released as soon as it has been used. This lowers the
+    peak memory, at the cost of additional garbage collection runs.
+
+    Raises:
+        EnumerationTimeout: If args.enum_timeout is exceeded. The exception
+            contains the truncated network.
+
+    Returns:
+        dict[name] = obj: complexes
+        set[obj]: reactions
     """
+    assert all(isinstance(x, NuskellComplex) for x in complexes.values())
+    config = EnumerationConfig.from_args(args)
+    with ENUMERATION_LOCK:
+        return _enumerate_solution(complexes, config, named, molarity, prefix)
+
+def enumerate_sweep(complexes, args, rates, named = None, molarity = 'nM', prefix = 'i'):
+    """ Enumerate the condensed reaction networks for multiple rate settings.
+
+    The reaction moves of every complex are computed only once, and shared by
+    the enumerations for all (k_fast, k_slow) parameter sets (see the
+    move_cache of :obj:`NuskellEnumerator`). The resting states and the
+    condensed reactions are then derived separately for every parameter set,
+    so the results are the same as for separate calls to
+    :func:`enumerate_solution`.
+
+    Complexes and reactions are singletons, so the rate constant of a
+    :obj:`NuskellReaction` would be overwritten by the next parameter set.
+    The reactions are therefore returned as Reaction tuples of complex names.
+
+    Args:
+        complexes (dict[name] = obj): The initial complexes.
+        args (argparse.Namespace, EnumerationConfig): Enumeration settings.
+        rates (list[(flt, flt)]): The (k_fast, k_slow) parameter sets.
+        named (dict[name] = obj, optional): Complexes which should keep their
+            names if they are enumerated. Defaults to None.
+        molarity (str, optional): Concentration units. Defaults to 'nM'.
+        prefix (str, optional): Prefix of new complex names. Defaults to 'i'.
+
+    Returns:
+        list[(flt, flt, dict, list)]: For every parameter set: k_fast, k_slow,
+            the complexes and the reactions. Complexes and reactions are None
+            if the enumeration failed or exceeded args.enum_timeout.
+    """
+    assert all(isinstance(x, NuskellComplex) for x in complexes.values())
+    config = EnumerationConfig.from_args(args).copy(move_cache = dict(),
+                                                    checkpoint = None,
+                                                    resume = False)
+    results = []
+    with ENUMERATION_LOCK:
+        try:
+            for k_fast, k_slow in rates:
+                point = config.copy(k_fast = k_fast, k_slow = k_slow)
+                try:
+                    cxs, rxns = _enumerate_solution(dict(complexes), point, 
+                                                    named, molarity, prefix)
+                except (PolymerizationError, EnumerationTimeout) as err:
+                    log.warning(f'Enumeration with k_fast = {k_fast} and ' + \
+                                f'k_slow = {k_slow} failed: {err}')
+                    results.append((k_fast, k_slow, None, None))
+                    del err
+                    continue
+                crn = [Reaction([x.name for x in rxn.reactants], 
+                                [x.name for x in rxn.products], 
+                                rxn.rate_constant[0], 0) for rxn in rxns]
+                results.append((k_fast, k_slow, cxs, crn))
+                del rxns
+        finally:
+            config.move_cache.clear()
+            gc.collect()
+    return results
+
+def enumerate_reactions(complexes, args, named = None, molarity = 'nM', prefix = 'i'):
+    """ Enumerate a DSD system, yielding reactions as soon as they are condensed.
+
+    This is the generator version of :func:`enumerate_solution`, see there
+    for the arguments. Peppercorn condenses the network of a system only when
+    enumeration is complete, so the reactions of every independent subsystem
+    are yielded as soon as that subsystem has been enumerated. New complexes
+    are added to the complexes dictionary before their reactions are yielded.
+
+    The ENUMERATION_LOCK is held until the generator is exhausted or closed.
+
+    Raises:
+        EnumerationTimeout: After all reactions of the truncated network have
+            been yielded, if args.enum_timeout is exceeded.
+
+    Yields:
+        obj: reactions
     """
     assert all(isinstance(x, NuskellComplex) for x in complexes.values())
-    tmp_pil = write_pil(complexes, None, fh = None, molarity = molarity)
-
-    # We want to pass also the named complexes ...
-    if named is not None:
-        tmp_pil += "\n# Named complexes ...\n"
-        domains = get_domains(complexes.values())
-        for cx in named.values():
-            if cx.name in complexes:
+    config = EnumerationConfig.from_args(args)
+    with ENUMERATION_LOCK:
+        yield from _enumerate_reactions(complexes, config, named, molarity, prefix)
+
+def _enumerate_solution(complexes, args, named, molarity, prefix):
+    reactions = set(_enumerate_reactions(complexes, args, named, molarity, prefix))
+    return complexes, reactions
+
+def _enumerate_reactions(complexes, args, named, molarity, prefix):
+    # We want to pass also the named complexes, to make sure they do not get
+    # new names.
+    known = dict(named) if named is not None else dict()
+
+    if not args.partition or args.checkpoint:
+        # A checkpoint belongs to the enumeration of exactly one input.
+        subsystems = [dict(complexes)]
+    else:
+        subsystems = independent_subsystems(complexes)
+        if len(subsystems) > 1:
+            log.info(f'Enumerating {len(subsystems)} independent subsystems.')
+
+    pilstrings = []
+    for subsystem in subsystems:
+        tmp_pil = write_pil(subsystem, None, fh = None, molarity = molarity)
+        if known:
+            tmp_pil += "\n# Named complexes ...\n"
+            domains = get_domains(subsystem.values())
+            for cx in known.values():
+                if cx.name in complexes:
+                    del cx
+                    continue
+                if not all(d in domains for d in cx.domains):
+                    continue
+                tmp_pil += "{:s} = {:s} @c 0 nM\n".format(cx.name, cx.kernel_string)
                 del cx
-                continue
-            if not all(d in domains for d in cx.domains):
-                continue
-            tmp_pil += "{:s} = {:s} @c 0 nM\n".format(cx.name, cx.kernel_string)
-            del cx
-        del domains
-    log.debug(tmp_pil)
-
-    kwargs = get_peppercorn_args(args)
-    enum_obj, enum_pil = enumerate_pil(tmp_pil,
-                                       detailed = args.enum_detailed,
-                                       condensed = not args.enum_detailed,
-                                       complex_prefix = prefix,
-                                       enumconc = molarity,
-                                       **kwargs)
-    del enum_obj
+            del domains
+        log.debug(tmp_pil)
+        pilstrings.append(tmp_pil)
+        subsystem.clear()
+    subsystems.clear()
+
+    kwargs = args.peppercorn_kwargs()
+    if args.enum_workers > 1 and len(pilstrings) > 1:
+        results = _enumerate_parallel(pilstrings, kwargs, args, molarity, prefix)
+    else:
+        results = _enumerate_sequential(pilstrings, kwargs, args, molarity, prefix)
+
     # Now we get the new NuskellComplex objects.  If you enumerate multiple
     # times, e.g. because you enumerate some modules separately, then you want
     # to make sure that the same complexes have the same name.
     reactions = set()
+    truncated = False
+    try:
+        for trunc, enum_pil in results:
+            truncated = truncated or trunc
+            if enum_pil is None:
+                continue
+            new = set()
+            _load_network(enum_pil, complexes, new, args.enum_detailed)
+            del enum_pil
+            if args.enum_low_memory:
+                gc.collect()
+            reactions |= new
+            yield from new
+            new.clear()
+    finally:
+        results.close()
+        pilstrings.clear()
+        known.clear()
+
+    if truncated:
+        raise EnumerationTimeout(f'Enumeration exceeded {args.enum_timeout} seconds.',
+                                 complexes, reactions)
+    # Do not keep references to singleton objects.
+    reactions.clear()
+
+def _enumerate_sequential(pilstrings, kwargs, args, molarity, prefix):
+    """ Enumerate independent subsystems one after the other.
 
-    cxs, rms, det, con = load_pil(enum_pil)
-    if args.enum_detailed:
+    The time budget is shared between all subsystems, and enumeration stops
+    after the first truncated subsystem. Time spent by the caller between two
+    subsystems does not count.
+
+    Yields:
+        bool: True if the enumeration has been truncated.
+        str: The enumerated network in PIL format (or None).
+    """
+    spent = 0
+    for e, tmp_pil in enumerate(pilstrings):
+        if args.enum_timeout and e > 0:
+            kwargs['timeout'] = args.enum_timeout - spent
+            if kwargs['timeout'] <= 0:
+                yield True, None
+                return
+        start = time.perf_counter()
+        enum_obj, enum_pil = enumerate_pil(tmp_pil, kwargs,
+                                           detailed = args.enum_detailed,
+                                           condensed = not args.enum_detailed,
+                                           complex_prefix = prefix,
+                                           enumconc = molarity,
+                                           resume = args.resume,
+                                           release = args.enum_low_memory,
+                                           backend = args.enum_backend)
+        spent += time.perf_counter() - start
+        truncated = enum_obj.truncated
+        del enum_obj
+        yield truncated, enum_pil
+        if truncated:
+            return
+
+def _enumerate_parallel(pilstrings, kwargs, args, molarity, prefix):
+    """ Enumerate independent subsystems in separate processes.
+
+    Every process starts with the same complex counter and uses its own
+    complex prefix (e.g. i1_, i2_, ...). Afterwards, the complexes of every
+    subsystem are renamed in order, such that the names are the same as with
+    :func:`_enumerate_sequential`. Progress reports and the move cache are
+    not available in other processes.
+
+    Yields:
+        bool: True if the enumeration has been truncated.
+        str: The enumerated network in PIL format.
+    """
+    kwargs = {k: v for k, v in kwargs.items() if k not in ('progress', 'move_cache')}
+    first_id = PepperComplex.ID
+    context = multiprocessing.get_context('spawn')
+    workers = min(args.enum_workers, len(pilstrings))
+    log.info(f'Using {workers} processes for {len(pilstrings)} subsystems.')
+    pool = ProcessPoolExecutor(max_workers = workers, mp_context = context)
+    try:
+        jobs = [pool.submit(_enumerate_subsystem, tmp_pil, kwargs, args.enum_detailed, 
+                            molarity, f'{prefix}{e}_', first_id, args.enum_backend) 
+                for e, tmp_pil in enumerate(pilstrings, 1)]
+        for e, job in enumerate(jobs, 1):
+            truncated, enum_pil, next_id = job.result()
+            base = PepperComplex.ID
+            enum_pil = re.sub(rf'\b{re.escape(prefix)}{e}_(\d+)\b', 
+                              lambda m: f'{prefix}{base + int(m.group(1)) - first_id}', 
+                              enum_pil)
+            PepperComplex.ID = base + next_id - first_id
+            yield truncated, enum_pil
+    finally:
+        pool.shutdown(wait = True, cancel_futures = True)
+
+def _enumerate_subsystem(pilstring, kwargs, detailed, molarity, prefix, first_id,
+                         backend = 'peppercorn'):
+    """ Enumerate a subsystem in a worker process, see :func:`enumerate_pil`.
+
+    Returns:
+        bool: True if the enumeration has been truncated.
+        str: The enumerated network in PIL format.
+        int: The next free complex number.
+    """
+    PepperComplex.ID = first_id
+    with ENUMERATION_LOCK:
+        enum_obj, enum_pil = enumerate_pil(pilstring, kwargs,
+                                           detailed = detailed,
+                                           condensed = not detailed,
+                                           complex_prefix = prefix,
+                                           enumconc = molarity,
+                                           backend = backend)
+    return enum_obj.truncated, enum_pil, PepperComplex.ID
+
+def _load_network(enum_pil, complexes, reactions, detailed):
+    """ Add the complexes and reactions of an enumerated PIL string.
+
+    The enumerated complexes are read as :obj:`EnumeratedComplex` objects
+    and matched with NuskellComplex objects by their structure, see
+    :func:`_loaded_complex`. Existing objects are left untouched.
+    """
+    cxs, rms, det, con = load_pil(enum_pil, complex_type = EnumeratedComplex)
+    objects = dict() # [enumerated name] = NuskellComplex
+    if detailed:
+        # Named complexes which have not been enumerated are ignored.
+        used = set(s.name for rxn in det for s in chain(rxn.reactants, rxn.products))
         for name, cx in cxs.items(): # The new complexes.
-            try:
-                obj = NuskellComplex(None, None, name = name)
-            except SingletonError as err:
-                obj = NuskellComplex(list(cx.sequence), list(cx.structure), name = name)
-                del err
-            complexes[obj.name] = obj
+            if name not in used and name not in complexes:
+                del cx
+                continue
+            obj = _loaded_complex(name, cx)
+            objects[name] = complexes[obj.name] = obj
             del obj, cx
         for drxn in det:
-            reactants = [complexes[s.name] for s in drxn.reactants]
-            products = [complexes[s.name] for s in drxn.products]
+            reactants = [objects[s.name] for s in drxn.reactants]
+            products = [objects[s.name] for s in drxn.products]
             try:
                 obj = NuskellReaction(reactants, products, drxn.rtype)
             except SingletonError as err:
@@ -129,22 +1070,19 @@ def enumerate_solution(complexes, args, named = None, molarity = 'nM', prefix =
             obj.rate_constant = (drxn.rate_constant)
             reactions.add(obj)
             del drxn, obj, reactants, products
+        used.clear()
     else:
         for name, rm in rms.items():
             cx = rm.representative
             assert name == cx.name
-            try:
-                obj = NuskellComplex(None, None, name = name)
-            except SingletonError as err:
-                obj = NuskellComplex(list(cx.sequence), list(cx.structure), name = name)
-                del err
-            complexes[obj.name] = obj
+            obj = _loaded_complex(name, cx)
+            objects[name] = complexes[obj.name] = obj
             del obj, rm, cx
  
         for crxn in con:
             # We extract take objects with the correct names.
-            reactants = [complexes[s.name] for s in crxn.reactants]
-            products = [complexes[s.name] for s in crxn.products]
+            reactants = [objects[s.name] for s in crxn.reactants]
+            products = [objects[s.name] for s in crxn.products]
             try:
                 obj = NuskellReaction(reactants, products, crxn.rtype)
             except SingletonError as err:
@@ -153,11 +1091,46 @@ def enumerate_solution(complexes, args, named = None, molarity = 'nM', prefix =
             obj.rate_constant = crxn.rate_constant
             reactions.add(obj)
             del crxn, obj, reactants, products
+    objects.clear()
     cxs.clear()
     rms.clear()
     det.clear()
     con.clear()
-    return complexes, reactions
+
+def _loaded_complex(name, cx):
+    """ The NuskellComplex object of an enumerated complex.
+
+    Complexes which exist already (e.g. from a previous enumeration) keep
+    their names. If the name is taken by a different complex, a new name is
+    derived from it.
+    """
+    candidate, k = name, 0
+    while True:
+        try:
+            obj = NuskellComplex(None, None, name = candidate)
+        except SingletonError as err:
+            del err
+            break
+        if obj.canonical_form == cx.canonical_form:
+            return obj
+        del obj
+        k += 1
+        candidate = f'{name}_{k}'
+    try:
+        obj = NuskellComplex(list(cx.sequence), list(cx.structure), name = candidate)
+    except SingletonError as err:
+        # The complex exists with a different name.
+        return err.existing
+    obj.concentration = cx.concentration
+    return obj
+
+class EnumeratedComplex(ComplexS):
+    """ A complex read from an enumerated PIL string.
+
+    This class has its own singleton registry, such that names chosen by the
+    enumerator cannot clash with existing NuskellComplex objects.
+    """
+    pass
 
 def interpret_species(complexes, reactions, fspecies, prune = True):
     """Get an interpretation dictionary.
@@ -323,33 +1296,10 @@ def interpret_species(complexes, reactions, fspecies, prune = True):
     return interpretation, complexes, reactions
 
 def get_peppercorn_args(args):
-    """Transfer options to self._enumerator object.
+    """Transfer options to the peppercorn Enumerator object.
 
     Do NOT change default values here. These are supposed to be the defaults of
     peppercorn!  Defaults for nuskell or any other script using this library are
     set with the argparse object of your script, e.g. nuskell/framework.py.
     """
-    kwargs = dict()
-
-    kwargs['max_complex_size'] = args.max_complex_size
-    kwargs['max_complex_count'] = args.max_complex_count
-    kwargs['max_reaction_count'] = args.max_reaction_count
-    kwargs['reject_remote'] = args.reject_remote
-    kwargs['max_helix'] = not args.no_max_helix
-    if args.ignore_branch_3way:
-        if branch_3way in UNI_REACTIONS[1]:
-            UNI_REACTIONS[1].remove(branch_3way)
-        log.info('No 3-way branch migration.')
-    if args.ignore_branch_4way:
-        if branch_4way in UNI_REACTIONS[1]:
-            UNI_REACTIONS[1].remove(branch_4way)
-        log.info('No 4-way branch migration.')
-
-    kwargs['release_cutoff_1_1'] = args.release_cutoff_1_1
-    kwargs['release_cutoff_1_2'] = args.release_cutoff_1_2
-    if args.release_cutoff:
-        kwargs['release_cutoff'] = args.release_cutoff
-    kwargs['k_slow'] = args.k_slow
-    kwargs['k_fast'] = args.k_fast
-
-    return kwargs
+    return EnumerationConfig.from_args(args).peppercorn_kwargs()
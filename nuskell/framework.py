@@ -17,14 +17,22 @@ from natsort import natsorted
 
 from . import __version__
 from .dsdcompiler import translate, get_builtin_schemes
-from .dsdenumerator import enumerate_solution, enumerate_modules, interpret_species
-from .crnverifier import verify, verify_modules
+from .dsdenumerator import (enumerate_solution, 
+                            enumerate_modules, 
+                            derive_modules,
+                            enumerate_crosstalk,
+                            enumerate_sweep,
+                            interpret_species,
+                            EnumerationTimeout)
+from .dsdanalysis import polymerization_risk, crosstalk_candidates
+from .crnverifier import (verify, verify_modules, verify_portfolio, 
+                          VerificationCache, FormalCRN)
 from .ioutils import (write_pil,
                       load_pil,
                       get_strands,
                       write_vdsd)
 from .crnutils import (parse_crn_string, Reaction, 
-                       assign_crn_species,
+                       VerificationCRN,
                        remove_species,
                        cleanup_rxns,
                        genCRN)
@@ -86,6 +94,28 @@ def get_peppercorn_args(parser):
             help="""Maximum number of complexes that may be enumerated before the enumerator halts.""")
     peppercorn.add_argument('--max-reaction-count', default=10_000, type=int, metavar='<int>',
             help="""Maximum number of reactions that may be enumerated before the enumerator halts.""")
+    peppercorn.add_argument('--enum-timeout', default=0, type=int, metavar='<int>',
+            help="""Maximum time in seconds for reaction enumeration. If the time
+            is exceeded, the truncated reaction network is reported. Defaults
+            to 0, i.e. no timeout.""")
+    peppercorn.add_argument('--enum-partition', dest='partition', action='store_true',
+            help="""Split the system into independent subsystems (groups of
+            complexes without complementary domains) and enumerate them
+            separately. The complex and reaction limits apply to every
+            subsystem.""")
+    peppercorn.add_argument('--enum-workers', default=1, type=int, metavar='<int>',
+            help="""Number of processes to enumerate independent subsystems
+            in parallel, requires --enum-partition.""")
+    peppercorn.add_argument('--enum-backend', default='peppercorn', 
+            choices=('peppercorn', 'screened'),
+            help="""Choose the reaction enumerator. Both use peppercorn, but
+            'screened' skips binding moves between complexes without
+            complementary exposed domains, and uses a faster condensation.
+            The reaction network is the same.""")
+    peppercorn.add_argument('--enum-low-memory', action='store_true',
+            help="""Release intermediate results of reaction enumeration as
+            early as possible, to reduce peak memory usage for large
+            systems.""")
 
     peppercorn.add_argument('--reject-remote', action='store_true',
             help="Discard remote toehold mediated 3-way and 4-way branch migration reactions.")
@@ -123,6 +153,7 @@ def get_nuskell_args(parser):
     #input = parser.add_mutually_exclusive_group(required=True)
     input = parser.add_argument_group('Nuskell Input Arguments (required - choose one)')
     default = parser.add_argument_group('Nuskell Output Arguments')
+    enum = parser.add_argument_group('Nuskell Enumeration Arguments')
     verify = parser.add_argument_group('Nuskell Verification Arguments')
     simulate = parser.add_argument_group('Nuskell Simulation Arguments')
 
@@ -171,6 +202,32 @@ def get_nuskell_args(parser):
             help="""Enumerate the DSD system. This is turned on automatically
             when using the argument --verify in combination with --ts or --readpil.""")
 
+    enum.add_argument("--checkpoint", action='store', default=None, metavar='</path/to/file>',
+            help="""Periodically write the state of the reaction enumeration
+            to a file, such that enumeration can be resumed using --resume.""")
+    enum.add_argument("--checkpoint-interval", type=int, default=300, metavar='<int>',
+            help="Specify time in seconds between two enumeration checkpoints.")
+    enum.add_argument("--resume", action='store_true',
+            help="""Resume reaction enumeration from the --checkpoint file, e.g.
+            after the enumeration has been interrupted, or exceeded
+            --max-complex-count or --max-reaction-count.""")
+    enum.add_argument("--auto-reject-remote", action='store_true',
+            help="""Analyze the compiled system for complexes that may bind
+            into unbounded polymers, and use --reject-remote enumeration
+            semantics if any are found.""")
+    enum.add_argument("--crosstalk-screen", action='store_true',
+            help="""List candidate interactions between the initial complexes
+            of different CRN modules, and enumerate only those to find
+            crosstalk. Intermediates and wastes are not screened.""")
+    enum.add_argument("--derive-modules", action='store_true',
+            help="""Derive the reaction networks of individual modules from the
+            enumerated network of the full system, instead of enumerating
+            every module separately.""")
+    enum.add_argument("--rate-sweep", nargs='+', default=[], metavar='<k_fast,k_slow>',
+            help="""Report the condensed reaction network for every pair of
+            --k-fast and --k-slow values, e.g. --rate-sweep 1,0 10,0.1. The
+            reaction moves are enumerated only once for all pairs.""")
+
     # Choose a verification method.
     verify.add_argument("--verify", nargs = '+', default = [], action = 'store',
             choices = ('crn-bisimulation', 
@@ -181,12 +238,15 @@ def get_nuskell_args(parser):
                        'modular-crn-bisimulation-bf', 
                        'pathway-decomposition', 
                        'compositional-hybrid',
-                       'integrated-hybrid'), metavar = '<str>', 
+                       'integrated-hybrid',
+                       'random-walk'), metavar = '<str>', 
             help="""Specify verification methods. Choose one or more from:
             crn-bisimulation, crn-bisimulation-ls, crn-bisimulation-bf, 
             modular-crn-bisimulation, 
             modular-crn-bisimulation-ls, modular-crn-bisimulation-bf, 
-            pathway-decomposition, integrated-hybrid, compositional-hybrid.""")
+            pathway-decomposition, integrated-hybrid, compositional-hybrid,
+            random-walk. The random-walk method only searches for
+            counterexamples, it reports False or no result.""")
 
     verify.add_argument("--modular", action = 'store_true',
             #help="""After enumeration of the full system, enumerate individual
@@ -197,6 +257,56 @@ def get_nuskell_args(parser):
 
     verify.add_argument("--verify-timeout", type = int, default = 30, metavar = '<int>',
             help="Specify time in seconds to wait for verification to complete.")
+    verify.add_argument("--verify-memory", type = int, default = 0, metavar = '<int>',
+            help="""Specify a memory limit in MiB for verification. Verification
+            without a result within the limit is treated like a timeout.
+            Defaults to 0, i.e. no limit.""")
+    verify.add_argument("--verify-workers", type = int, default = 0, metavar = '<int>',
+            help="""Verify every module of modular-crn-bisimulation methods in
+            a separate process, using at most this many processes at the same
+            time. Defaults to 0, i.e. all modules are verified in one process
+            (with --verify-reuse-modules: one process for every CPU).""")
+    verify.add_argument("--verify-samples", type = int, default = 1000, metavar = '<int>',
+            help="""Specify the number of random trajectories of the
+            implementation CRN sampled by the random-walk method. Defaults to
+            1000.""")
+    verify.add_argument("--verify-reuse-modules", action = 'store_true',
+            help="""Verify every module of modular-crn-bisimulation methods in
+            a separate process, and verify modules which are identical up to
+            a renaming of species only once. Results of modules are stored in
+            the verification cache.""")
+    verify.add_argument("--verify-hints", action = 'store_true',
+            help="""Interpret intermediates which are only produced by a
+            reversible reaction of interpreted species (e.g. a signal bound
+            to a gate) and try crn-bisimulation with these hints first. The
+            original partial interpretation is used if that fails.""")
+    verify.add_argument("--verify-reduce", action = 'store_true',
+            help="""Merge linear chains of intermediates and collapse
+            duplicate intermediates of the implementation CRN before
+            verification with pathway-decomposition.""")
+    verify.add_argument("--verify-decompose", action = 'store_true',
+            help="""Verify the species-disjoint components of the formal CRN
+            separately (in parallel) with crn-bisimulation or
+            pathway-decomposition, if the implementation CRN can be projected
+            onto them. Not used with --verify-portfolio.""")
+    verify.add_argument("--verify-prefilter", action = 'store_true',
+            help="""Reject the implementation CRN without verification if it
+            fails a cheap necessary condition for crn-bisimulation or
+            pathway-decomposition: every formal reaction must be achievable,
+            and for crn-bisimulation, interpreted reactions must be formal or
+            trivial and formal conservation laws must hold.""")
+    verify.add_argument("--no-verify-cache", action = 'store_true',
+            help="""Do not look up or store verification results in the
+            persistent verification cache.""")
+    verify.add_argument("--verify-cache-dir", default = None, metavar = '<str>',
+            help="""Specify the directory of the verification cache.
+            Defaults to $XDG_CACHE_HOME/nuskell/verification (or
+            ~/.cache/nuskell/verification).""")
+    verify.add_argument("--verify-portfolio", nargs = '?', const = 'all', default = None,
+            choices = ('all', 'first'), metavar = '<str>',
+            help="""Run all verification methods concurrently in separate
+            processes, and report results as they arrive. Use 'first' to stop
+            the remaining methods after the first conclusive result.""")
 
     return parser
 
@@ -218,21 +328,41 @@ def assign_species(complexes):
     signals = [x for x in complexes.values() if x.name[0] not in ('f', 'i', 'w')]
     return fuels, wastes, intermediates, signals
 
+def log_progress(interval = 10):
+    """ Returns a progress function for enumerate_solution, logging every interval seconds. """
+    last = [0]
+    def progress(info):
+        if info['elapsed'] - last[0] >= interval:
+            last[0] = info['elapsed']
+            log.info("Enumerated {complexes} complexes and {reactions} reactions, ".format(**info) + \
+                     "{queue} complexes queued ({elapsed:.0f} seconds).".format(**info))
+    return progress
+
 def get_verification_crn(reactions, fuels, signals):
-    # Prepare the verification CRN - Step 1: 
+    """ The implementation CRN without fuel and waste species.
+
+    Args:
+        reactions (iterable[obj]): Enumerated reactions, e.g. a set or the
+            generator :func:`nuskell.dsdenumerator.enumerate_reactions`.
+        fuels (list[obj]): Fuel complexes.
+        signals (list[obj]): Signal complexes.
+
+    Returns:
+        list: The verification CRN.
+        set[str]: The names of fuel species.
+        set[str]: The names of waste species.
+    """
     fuels = set([x.name for x in fuels]) 
     signals = set([x.name for x in signals])
-    icrn = [Reaction([x.name for x in rxn.reactants], 
-                     [x.name for x in rxn.products], 
-                     rxn.rate_constant[0], 0) for rxn in reactions]
-    log.debug(f"Implementation CRN:\n  " + \
+    vcrn = VerificationCRN(fuels, signals)
+    for rxn in reactions:
+        vcrn.add(Reaction([x.name for x in rxn.reactants], 
+                          [x.name for x in rxn.products], 
+                          rxn.rate_constant[0], 0))
+    icrn = vcrn.crn()
+    log.debug(f"Implementation CRN without fuels and wastes:\n  " + \
                 '\n  '.join(natsorted(genCRN(icrn, reversible = True))))
-
-    # Prepare the verification CRN - Step 2: 
-    icrn = remove_species(icrn, fuels)
-    intermediates, wastes, _ = assign_crn_species(icrn, signals)
-    icrn = cleanup_rxns(remove_species(icrn, wastes))
-    return icrn, fuels, wastes
+    return icrn, fuels, vcrn.wastes
 
 def get_verification_modules(fcrn, mreactions, fuels, wastes):
     fcrns = [[m] for m in fcrn]
@@ -314,6 +444,17 @@ def main():
     if not args.modular:
         args.modular = any(map(lambda x: 'modular' in x, args.verify))
 
+    try:
+        rates = [tuple(map(float, x.split(','))) for x in args.rate_sweep]
+    except ValueError:
+        parser.error('--rate-sweep expects pairs of numbers: <k_fast,k_slow>')
+    if any(len(r) != 2 for r in rates):
+        parser.error('--rate-sweep expects pairs of numbers: <k_fast,k_slow>')
+    if any(k_fast <= 0 or k_slow < 0 for (k_fast, k_slow) in rates):
+        parser.error('--rate-sweep: rates must be positive (or k_slow = 0 for no cutoff)')
+    if any(k_slow > k_fast for (k_fast, k_slow) in rates):
+        parser.error('--rate-sweep: k_slow must not exceed k_fast')
+
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
     # Parse and process input CRN #
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
@@ -325,10 +466,13 @@ def main():
     # ~~~~~~~~~~~~~~~~~~ #
     if args.ts:  # Translate CRN using a translation scheme
         log.info(header(f"Translating using scheme {args.ts}"))
-        solution, modules = translate(input_crn, args.ts, modular = args.modular)
+        solution, modules = translate(input_crn, args.ts, 
+                                      modular = args.modular or args.crosstalk_screen)
     elif args.readpil:  # Parse information from a PIL file 
         if args.modular:
             raise NotImplementedError('Modular verification cannot be used in combiation with --readpil input.')
+        if args.crosstalk_screen:
+            raise NotImplementedError('Crosstalk screening cannot be used in combiation with --readpil input.')
         log.info(header(f"Parsing file {args.readpil}"))
         solution, rms, det, con = load_pil(args.readpil, is_file = True)
         if det:
@@ -388,9 +532,63 @@ def main():
             ' '.join(natsorted(map(str, signals))), 
             ' '.join(natsorted(map(str, fuels)))))
 
+    if args.crosstalk_screen:
+        candidates = crosstalk_candidates(modules)
+        log.info("Candidate interactions between modules:\n" + '\n'.join(
+            [f'   {x} + {y} ({d})' for x, y, d in candidates]))
+        crosstalk = enumerate_crosstalk(candidates, solution, args)
+        print(f"Crosstalk pre-screen: {len(candidates)} candidate interactions",
+              f"between initial complexes of modules, {len(crosstalk)} crosstalk reactions.")
+        for rxn in natsorted(crosstalk, key = str):
+            print(f' - {rxn}')
+        if not candidates:
+            print(" - no interactions between initial complexes of modules",
+                  "(intermediates and wastes are not screened).")
+        elif not crosstalk:
+            print(" - no candidate interaction results in a crosstalk reaction.")
+        print()
+        crosstalk.clear()
+
+    if rates:
+        log.info(header("Enumerating reaction pathways for multiple rates."))
+        sweep = enumerate_sweep(solution, args, rates, 
+                                molarity = args.concentration_units)
+        print(f"Rate sweep: {len(sweep)} pairs of k-fast and k-slow.")
+        for k_fast, k_slow, cxs, crn in sweep:
+            if crn is None:
+                print(f" - k-fast = {k_fast:g}, k-slow = {k_slow:g}: enumeration failed.")
+                continue
+            print(f" - k-fast = {k_fast:g}, k-slow = {k_slow:g}:",
+                  f"{len(cxs):3d} species, {len(crn):3d} reactions")
+            log.info(f"Condensed CRN (k-fast = {k_fast:g}, k-slow = {k_slow:g}):\n  " + \
+                     '\n  '.join(natsorted(genCRN(crn, reversible = True))))
+            cxs.clear()
+        print()
+        sweep.clear()
+
+    truncated = False
     if args.verify or args.enumerate:
+        risky = polymerization_risk(solution)
+        if risky and not args.reject_remote:
+            log.warning("Complexes may form unbounded polymers: " + \
+                        f"{', '.join(natsorted(risky))}")
+            if args.auto_reject_remote:
+                print("Using reject-remote enumeration semantics to avoid polymerization.")
+                args.reject_remote = True
+            else:
+                log.warning("Consider using --reject-remote enumeration semantics.")
+        del risky
+
         log.info(header("Enumerating reaction pathways."))
-        complexes, reactions = enumerate_solution(solution, args, molarity = args.concentration_units)
+        args.progress = log_progress()
+        try:
+            complexes, reactions = enumerate_solution(solution, args, 
+                                                      molarity = args.concentration_units)
+        except EnumerationTimeout as err:
+            log.warning(f'{err} Continuing with the truncated reaction network.')
+            complexes, reactions = err.complexes, err.reactions
+            truncated = True
+            del err
 
         if not len(reactions):
             raise SystemExit('No DSD reactions have been enumerated.')
@@ -413,6 +611,8 @@ def main():
         logger.info(f"Enumerated CRN: \n  " + \
                     '\n  '.join([rxn.reaction_string for rxn in reactions]))
 
+        if truncated:
+            print(f"Enumeration truncated after {args.enum_timeout} seconds!")
         if args.pilfile:
             with open(enumpil, 'w') as pil:
                 write_pil(complexes, reactions,
@@ -435,14 +635,22 @@ def main():
         print(' - {:3d} nucleotides to be designed\n'.format(sum(
             sum(map(lambda d: d.length, s)) for s in get_strands(complexes))))
 
-        if args.modular:
+        if args.modular and truncated:
+            log.warning("Skipping modular network enumeration of a truncated network.")
+        elif args.modular:
             log.info("")
             log.info("Modular network enumeration ...")
-            mcomplexes, mreactions = enumerate_modules(modules, 
-                                                       interpretation,
-                                                       complexes,
-                                                       reactions,
-                                                       args)
+            if args.derive_modules:
+                mcomplexes, mreactions = derive_modules(modules,
+                                                        interpretation,
+                                                        complexes,
+                                                        reactions)
+            else:
+                mcomplexes, mreactions = enumerate_modules(modules, 
+                                                           interpretation,
+                                                           complexes,
+                                                           reactions,
+                                                           args)
             print(f"Split reaction enumeration into {len(mcomplexes)} modules:")
             for e in range(len(mcomplexes)):
                 print(f' - module {e+1}: {len(mcomplexes[e])} complexes',
@@ -451,7 +659,9 @@ def main():
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
     # Verify correctness of implementation CRN #
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
-    if args.verify:
+    if args.verify and truncated:
+        print("No verification results: the enumerated reaction network is truncated.")
+    elif args.verify:
         logger.info(header("Verification using: {}".format(args.verify)))
         formals = set(fsc.keys())
         log.info(f"Formal CRN with {len(formals)} species:\n  " + \
@@ -469,18 +679,63 @@ def main():
                 log.info(f"Implementation Module {e}:\n  " + \
                         '\n  '.join(natsorted(genCRN(mcrn, 
                             reversible = True, rates = False))))
-        for meth in args.verify:
-            log.info(header("Verification method: {}".format(meth)))
-            if 'modular-' in meth and len(fcrns) > 1:
-                v, i = verify_modules(fcrns, icrns, formals, meth[8:], 
-                                      interpretation = interpretation, 
-                                      timeout = args.verify_timeout)
-            else:
-                if 'modular' in meth: meth = meth[8:]
-                v, i = verify(fcrn, icrn, formals, meth, 
-                              interpretation = interpretation, 
-                              timeout = args.verify_timeout)
-
+        cache = None if args.no_verify_cache else VerificationCache(args.verify_cache_dir)
+        # The formal CRN is prepared once for all verification methods.
+        formal = FormalCRN(fcrn, formals)
+
+        def verify_sequential():
+            for meth in args.verify:
+                log.info(header("Verification method: {}".format(meth)))
+                if 'modular-' in meth and len(fcrns) > 1:
+                    v, i, stats = verify_modules(fcrns, icrns, formals, meth[8:], 
+                                          interpretation = interpretation, 
+                                          timeout = args.verify_timeout,
+                                          memory = args.verify_memory,
+                                          cache = cache,
+                                          workers = args.verify_workers,
+                                          reuse = args.verify_reuse_modules,
+                                          instrument = True)
+                else:
+                    if 'modular' in meth: meth = meth[8:]
+                    v, i, stats = verify(formal, icrn, formals, meth, 
+                                  interpretation = interpretation, 
+                                  timeout = args.verify_timeout,
+                                  memory = args.verify_memory,
+                                  cache = cache,
+                                  reduce = args.verify_reduce,
+                                  decompose = args.verify_decompose,
+                                  prefilter = args.verify_prefilter,
+                                  samples = args.verify_samples,
+                                  hints = args.verify_hints,
+                                  instrument = True)
+                yield meth, v, i, stats
+
+        if args.verify_portfolio:
+            results = verify_portfolio(formal, icrn, formals, args.verify, 
+                                       interpretation = interpretation,
+                                       fcrns = fcrns if args.modular else None, 
+                                       icrns = icrns if args.modular else None, 
+                                       timeout = args.verify_timeout,
+                                       memory = args.verify_memory,
+                                       cache = cache,
+                                       reduce = args.verify_reduce,
+                                       prefilter = args.verify_prefilter,
+                                       samples = args.verify_samples,
+                                       first = args.verify_portfolio == 'first',
+                                       instrument = True)
+        else:
+            results = verify_sequential()
+
+        for meth, v, i, stats in results:
+            log.info(f"Verification statistics of {meth}: {stats}")
+            if meth == 'random-walk':
+                for init, trace in (i or []):
+                    log.info(f"Counterexample trace from {' + '.join(init)}:\n  " + \
+                        '\n  '.join(f"{' + '.join(R)} -> {' + '.join(P)}" for R, P in trace))
+                if v is None:
+                    print(f"No verification result for {meth}.",
+                          f"No counterexample in {args.verify_samples} samples.")
+                    continue
             if v:
                 log.info(f"Returned interpretation for {meth}:\n  " + \
                             '\n  '.join(f"{k} => {', '.join(v)}" \
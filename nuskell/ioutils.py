@@ -25,11 +25,15 @@ def get_strands(complexes):
     [strands.add(tuple(s)) for cplx in complexes.values() for s in cplx.strand_table]
     return strands
 
-def load_pil(data, is_file = False):
-    """ Parses a string or file written in PIL notation! """
+def load_pil(data, is_file = False, complex_type = None):
+    """ Parses a string or file written in PIL notation! 
+
+    The complexes are NuskellComplex objects, unless a different complex_type
+    is specified.
+    """
     # We only assign reactions in a postprocessing step,
     # because there are no macrostates in nuskell.
-    set_io_objects(D = NuskellDomain, C = NuskellComplex)
+    set_io_objects(D = NuskellDomain, C = complex_type or NuskellComplex)
     out = dsd_read_pil(data, is_file)
     clear_io_objects()
 
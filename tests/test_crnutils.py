@@ -10,7 +10,13 @@ from nuskell.crnutils import (Reaction,
                               combine_reversible_rxns,
                               remove_species,
                               remove_trivial_rxns,
-                              remove_duplicate_rxns)
+                              remove_duplicate_rxns,
+                              VerificationCRN,
+                              parse_crn_string,
+                              reduce_crn,
+                              expand_interpretation,
+                              crn_components,
+                              project_crn)
 
 class TestCRN_utils(unittest.TestCase):
     def test_split_reversible_rxns(self):
@@ -42,3 +48,53 @@ class TestCRN_utils(unittest.TestCase):
                Reaction(['A', 'B'], ['B', 'B'], 1, 0)]
         crn2 = [Reaction(['A', 'B'], ['B', 'B'], 1, 1)]
         assert remove_duplicate_rxns(crn) == crn2
+
+    def test_verification_crn(self):
+        crn = [Reaction(['i3'], ['i4'], 1, 0),
+               Reaction(['A', 'f'], ['i1', 'w1'], 1, 0),
+               Reaction(['i1'], ['B', 'w2'], 1, 0),
+               Reaction(['i1', 'f'], ['B', 'w2'], 2, 0),
+               Reaction(['w1', 'w2'], ['w3'], 1, 0),
+               Reaction(['B', 'f'], ['i2'], 1, 0),
+               Reaction(['i2'], ['B', 'f'], 1, 0),
+               Reaction(['i4', 'B'], ['B'], 1, 0)]
+        vcrn = VerificationCRN({'f'}, {'A', 'B'})
+        for rxn in crn:
+            vcrn.add(rxn)
+        assert vcrn.wastes == {'w1', 'w2', 'w3'}
+        assert vcrn.crn(reversible = False) == [
+                Reaction(['i3'], ['i4'], 1, 0),
+                Reaction(['A'], ['i1'], 1, 0),
+                Reaction(['i1'], ['B'], 1, 0),
+                Reaction(['B'], ['i2'], 1, 0),
+                Reaction(['i2'], ['B'], 1, 0),
+                Reaction(['B', 'i4'], ['B'], 1, 0)]
+        assert vcrn.crn() == combine_reversible_rxns(vcrn.crn(reversible = False))
+
+    def test_reduce_crn(self):
+        crn, _ = parse_crn_string('A + B -> i1; i1 -> i2 + w; i2 -> C; ' + \
+                                  'A + B -> j1; j1 -> C; C -> k; k -> A; C -> l; l -> A; x <=> y')
+        rcrn, removed = reduce_crn(crn, {'A', 'B', 'C'})
+        assert sorted((sorted(r.reactants), sorted(r.products)) for r in rcrn) == [
+                (['A', 'B'], ['C']), (['A', 'B'], ['C', 'w']), (['C'], ['A']), 
+                (['x'], ['y']), (['y'], ['x'])]
+        assert [x for x, _ in removed] == ['i1', 'i2', 'j1', 'k', 'l']
+        inter = {'A': ['A'], 'B': ['B'], 'C': ['C'], 'w': [], 'x': [], 'y': []}
+        inter = expand_interpretation(inter, removed)
+        assert inter['i1'] == inter['i2'] == inter['j1'] == ['C']
+        assert inter['k'] == inter['l'] == ['A']
+        # Species to keep are never removed.
+        rcrn, removed = reduce_crn(crn, {'A', 'B', 'C', 'i1', 'i2', 'j1', 'k', 'l'})
+        assert len(rcrn) == 11 and removed == []
+
+    def test_crn_components(self):
+        fcrn, _ = parse_crn_string('A + B -> C; D -> E')
+        components = crn_components(fcrn, ['A', 'B', 'C', 'D', 'E', 'F'])
+        assert [sorted(x) for x, _ in components] == [['A', 'B', 'C'], ['D', 'E'], ['F']]
+        icrn, _ = parse_crn_string('A + B -> i; i -> C; D -> j; j -> E; x -> F')
+        parts = project_crn(icrn, components, {'A', 'B', 'C', 'D', 'E', 'F'})
+        assert list(map(len, parts)) == [2, 2, 1]
+        icrn, _ = parse_crn_string('A + B -> i; i -> C; D -> j; j -> E; x -> y')
+        assert project_crn(icrn, components, {'A', 'B', 'C', 'D', 'E', 'F'}) is None
+        assert project_crn(icrn, components, {'A', 'B', 'C', 'D', 'E', 'F'}, 
+                           interpretation = {'y': ['F']}) is not None
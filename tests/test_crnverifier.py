@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+#
+#  test_crnverifier.py
+#  NuskellCompilerProject
+#
+import os
+import time
+import unittest
+import tempfile
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from crnverifier import crn_bisimulation
+
+from nuskell.crnutils import parse_crn_string, split_reversible_rxns
+from nuskell.crnverifier import (verify, 
+                                verify_modules,
+                                verify_portfolio, 
+                                precheck,
+                                random_walk_test,
+                                interpretation_hints,
+                                run_with_limits,
+                                VerificationCache,
+                                VerificationError,
+                                FormalCRN)
+
+class VerificationTests(unittest.TestCase):
+    def setUp(self):
+        self.fcrn, fsc = parse_crn_string('A + B -> C')
+        self.formals = set(fsc)
+        self.icrn, _ = parse_crn_string('A + B -> i; i -> C')
+        self.wrong, _ = parse_crn_string('A + B -> i; i -> C; i -> A')
+
+    def test_verify(self):
+        interpretation = {'A': ['A'], 'B': ['B'], 'C': ['C']}
+        v, i = verify(self.fcrn, self.icrn, self.formals, 'crn-bisimulation', 
+                      interpretation = interpretation, timeout = 10)
+        assert v is True
+        assert i['i'] == ['A', 'B'] or i['i'] == ['C']
+        v, _ = verify(self.fcrn, self.wrong, self.formals, 'crn-bisimulation', 
+                      interpretation = interpretation)
+        assert v is False
+        v, _ = verify(self.fcrn, self.icrn, self.formals, 'pathway-decomposition')
+        assert v is True
+        with self.assertRaises(RuntimeError):
+            verify(self.fcrn, self.icrn, self.formals, 'bisimulation')
+
+    def test_verify_decompose(self):
+        fcrn, fsc = parse_crn_string('A + B -> C; D -> E')
+        formals = set(fsc)
+        interpretation = {x: [x] for x in formals}
+        icrn, _ = parse_crn_string('A + B -> i; i -> C; D -> j; j -> E')
+        wrong, _ = parse_crn_string('A + B -> i; i -> C; D -> j; j -> E; j -> D + D')
+        coupled, _ = parse_crn_string('A + B -> i; i -> C; D -> j; j -> E; i + D -> C + D')
+        for method in ['crn-bisimulation', 'pathway-decomposition']:
+            with self.assertLogs('nuskell.crnverifier', level = 'INFO') as cm:
+                v, i = verify(fcrn, icrn, formals, method, interpretation = interpretation, 
+                              decompose = True)
+            assert any('2 formal CRN components' in msg for msg in cm.output)
+            assert v is True
+            if i is not None:
+                assert i['i'] in (['A', 'B'], ['C']) and i['j'] in (['D'], ['E'])
+            # An incorrect component is confirmed on the full CRN.
+            with self.assertLogs('nuskell.crnverifier', level = 'INFO') as cm:
+                v, _ = verify(fcrn, wrong, formals, method, interpretation = interpretation, 
+                              decompose = True)
+            assert any('verifying the full CRN' in msg for msg in cm.output)
+            assert v is False
+            with self.assertLogs('nuskell.crnverifier', level = 'INFO') as cm:
+                v, _ = verify(fcrn, coupled, formals, method, interpretation = interpretation, 
+                              decompose = True)
+            assert any('Cannot project' in msg for msg in cm.output)
+            assert v == verify(fcrn, coupled, formals, method, interpretation = interpretation)[0]
+
+    def test_verify_reduce(self):
+        fcrn, fsc = parse_crn_string('A -> B; B -> C')
+        formals = set(fsc)
+        icrn, _ = parse_crn_string('A -> b; b -> C')
+        interpretation = {'A': ['A'], 'C': ['C']}
+        # Merging A -> b; b -> C into A -> C is unsound for crn-bisimulation.
+        for reduce in [False, True]:
+            v, i = verify(fcrn, icrn, formals, 'crn-bisimulation', 
+                          interpretation = interpretation, reduce = reduce)
+            assert v is True and i['b'] == ['B']
+        assert verify(fcrn, icrn, formals, 'pathway-decomposition', reduce = True)[0] == \
+               verify(fcrn, icrn, formals, 'pathway-decomposition')[0]
+
+    def test_precheck(self):
+        interpretation = {'A': ['A'], 'B': ['B'], 'C': ['C']}
+        split = lambda crn: [list(rxn[:2]) for rxn in crn]
+        fcrn = split(self.fcrn)
+        for method in ['crn-bisimulation', 'pathway-decomposition']:
+            assert precheck(fcrn, split(self.icrn), self.formals, method, interpretation) is None
+        # i -> A and A + B -> i can only conserve A + C and B + C if B is worth nothing.
+        reason = precheck(fcrn, split(self.wrong), self.formals, 'crn-bisimulation', 
+                          interpretation)
+        assert 'conservation law' in reason
+        icrn, _ = parse_crn_string('A + C -> i; i -> C')
+        for method in ['crn-bisimulation', 'pathway-decomposition']:
+            reason = precheck(fcrn, split(icrn), self.formals, method, interpretation)
+            assert 'A + B -> C is not achievable' in reason
+        icrn, _ = parse_crn_string('A + B -> C; C -> B')
+        reason = precheck(fcrn, split(icrn), self.formals, 'crn-bisimulation', interpretation)
+        assert 'interprets to C -> B' in reason
+        # Rejected without verification, and the verdict agrees.
+        for wrong in [self.wrong, icrn]:
+            with self.assertLogs('nuskell.crnverifier', level = 'INFO') as cm:
+                v, _ = verify(self.fcrn, wrong, self.formals, 'crn-bisimulation', 
+                              interpretation = interpretation, prefilter = True)
+            assert v is False and any('Rejected' in msg for msg in cm.output)
+            assert verify(self.fcrn, wrong, self.formals, 'crn-bisimulation', 
+                          interpretation = interpretation)[0] is False
+
+    def test_formal_crn(self):
+        fcrn, fsc = parse_crn_string('A + B <=> C; D -> E')
+        formals = set(fsc)
+        interpretation = {x: [x] for x in formals}
+        formal = FormalCRN(fcrn, formals)
+        assert sorted(formal.crn) == [[['A', 'B'], ['C']], [['C'], ['A', 'B']], [['D'], ['E']]]
+        assert FormalCRN(formal.crn, formals).crn == formal.crn
+        assert FormalCRN.prepare(formal, formals) is formal
+        assert FormalCRN.prepare(formal, {'A'}) is not formal
+        # Prepared data is computed once and shared by all verifications.
+        assert formal.components is formal.components
+        fsp, laws = formal.conservation_laws
+        assert fsp == sorted(formals)
+        icrn, _ = parse_crn_string('A + B <=> i; i <=> C; D -> j; j -> E')
+        wrong, _ = parse_crn_string('A + B <=> i; i <=> C; D -> j; j -> E + E')
+        for method in ['crn-bisimulation', 'pathway-decomposition']:
+            for crn, verdict in [(icrn, True), (wrong, False)]:
+                v, _ = verify(formal, crn, formals, method, interpretation = interpretation,
+                              decompose = True, prefilter = True)
+                assert v is verdict
+                assert v == verify(fcrn, crn, formals, method, 
+                                   interpretation = interpretation)[0]
+
+    def test_random_walk(self):
+        interpretation = {'A': ['A'], 'B': ['B'], 'C': ['C']}
+        split = lambda crn: [list(rxn[:2]) for rxn in crn]
+        fcrn = split(self.fcrn)
+        assert random_walk_test(fcrn, split(self.icrn), self.formals, interpretation, 
+                                samples = 100, seed = 1) == (None, None)
+        v, traces = random_walk_test(fcrn, split(self.wrong), self.formals, interpretation, 
+                                     samples = 100, seed = 1)
+        assert v is False and 1 <= len(traces) <= 3
+        for init, trace in traces:
+            assert trace[-1] == [['i'], ['A']]
+        v, traces = verify(self.fcrn, self.wrong, self.formals, 'random-walk', 
+                           interpretation = interpretation, samples = 100)
+        assert v is False and len(traces) > 0
+
+    def test_interpretation_hints(self):
+        interpretation = {'A': ['A'], 'B': ['B'], 'C': ['C']}
+        icrn, _ = parse_crn_string('A <=> i; i + B -> j; j <=> k + C')
+        split = [list(rxn[:2]) for rxn in split_reversible_rxns(icrn)]
+        # j has two producing reactions, k is only interpretable via j.
+        assert interpretation_hints(split, interpretation) == {'i': ['A']}
+        with self.assertLogs('nuskell.crnverifier', level = 'INFO') as cm:
+            v, i = verify(self.fcrn, icrn, self.formals, 'crn-bisimulation', 
+                          interpretation = interpretation, hints = True)
+        assert any('i => A' in msg for msg in cm.output)
+        assert v is True and i['i'] == ['A']
+
+        # The fallback without hints only gets the rest of the timeout.
+        timeouts = []
+        def slow(func, args, timeout = 0, memory = 0, stats = None):
+            timeouts.append(timeout)
+            time.sleep(0.5)
+            return None, None
+        with mock.patch('nuskell.crnverifier.run_with_limits', slow):
+            v, _ = verify(self.fcrn, icrn, self.formals, 'crn-bisimulation', 
+                          interpretation = interpretation, hints = True, timeout = 2)
+        assert v is None and timeouts[0] == 2 and 0 < timeouts[1] < 2
+        timeouts.clear()
+        with mock.patch('nuskell.crnverifier.run_with_limits', slow):
+            verify(self.fcrn, icrn, self.formals, 'crn-bisimulation', 
+                   interpretation = interpretation, hints = True, timeout = 0.2)
+        assert timeouts == [0.2]
+
+    def test_verification_stats(self):
+        interpretation = {'A': ['A'], 'B': ['B'], 'C': ['C']}
+        icrn, _ = parse_crn_string('A + B -> i; i -> j; j -> C')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = VerificationCache(tmpdir)
+            for cached in [False, True]:
+                v, i, stats = verify(self.fcrn, icrn, self.formals, 'pathway-decomposition', 
+                                     reduce = True, cache = cache, instrument = True)
+                assert v is True and stats.cached is cached
+                assert stats.size == (3, 5) and stats.reduced_size == (1, 3)
+                assert stats.wall_time > 0
+            # Searches in the calling process are not counted.
+            assert not any(stats.counters.values())
+        assert crn_bisimulation.search_row.__module__ == 'crnverifier.crn_bisimulation'
+        # Searches are counted in verification processes.
+        _, _, stats = verify(self.fcrn, icrn, self.formals, 'crn-bisimulation', 
+                             interpretation = interpretation, timeout = 60, instrument = True)
+        assert stats.counters['search rows'] > 0 and 'search rows' in str(stats)
+        _, _, stats = verify(self.fcrn, icrn, self.formals, 'pathway-decomposition', 
+                             timeout = 60, instrument = True)
+        assert stats.counters['tidy checks'] > 0 and stats.cached is None
+        results = list(verify_portfolio(self.fcrn, icrn, self.formals, 
+                       ['crn-bisimulation', 'pathway-decomposition'], 
+                       interpretation = interpretation, instrument = True))
+        assert all(st.method == m and st.size == (3, 5) for m, _, _, st in results)
+
+    def test_verify_threads(self):
+        def job(icrn):
+            return verify(self.fcrn, icrn, self.formals, 'pathway-decomposition', 
+                          timeout = 10)[0]
+        with ThreadPoolExecutor(max_workers = 2) as pool:
+            results = list(pool.map(job, [self.icrn, self.wrong] * 2))
+        assert results == [True, False, True, False]
+
+    def test_verify_portfolio(self):
+        interpretation = {'A': ['A'], 'B': ['B'], 'C': ['C']}
+        methods = ['crn-bisimulation', 'pathway-decomposition', 'modular-crn-bisimulation']
+        results = list(verify_portfolio(self.fcrn, self.wrong, self.formals, methods, 
+                                        interpretation = interpretation, timeout = 10))
+        assert sorted(m for m, _, _ in results) == sorted(methods)
+        assert all(v is False for _, v, _ in results)
+        results = list(verify_portfolio(self.fcrn, self.icrn, self.formals, methods, 
+                                        interpretation = interpretation, first = True))
+        assert len(results) == 1 and results[0][1] is True
+        with self.assertRaises(RuntimeError):
+            list(verify_portfolio(self.fcrn, self.icrn, self.formals, ['bisimulation']))
+        results = list(verify_portfolio(self.fcrn, self.icrn, self.formals, ['bisimulation'],
+                                        catch = (RuntimeError,)))
+        assert isinstance(results[0][1], RuntimeError)
+
+    def test_verification_cache(self):
+        interpretation = {'A': ['A'], 'B': ['B'], 'C': ['C']}
+        renamed, _ = parse_crn_string('j -> C; B + A -> j')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = VerificationCache(tmpdir)
+            v, i = verify(self.fcrn, self.icrn, self.formals, 'crn-bisimulation', 
+                          interpretation = interpretation, cache = cache)
+            assert (cache.hits, cache.misses) == (0, 1)
+            w, j = verify(self.fcrn, renamed, self.formals, 'crn-bisimulation', 
+                          interpretation = interpretation, cache = cache)
+            assert (cache.hits, cache.misses) == (1, 1)
+            assert v is w is True
+            assert j['j'] == i['i']
+            # A different method or interpretation is a different input.
+            verify(self.fcrn, renamed, self.formals, 'pathway-decomposition', cache = cache)
+            verify(self.fcrn, renamed, self.formals, 'crn-bisimulation', cache = cache)
+            assert (cache.hits, cache.misses) == (1, 3)
+            results = list(verify_portfolio(self.fcrn, self.icrn, self.formals, 
+                    ['crn-bisimulation', 'pathway-decomposition'], 
+                    interpretation = interpretation, cache = cache))
+            assert [v for _, v, _ in results] == [True, True]
+            assert cache.hits == 3
+
+    def test_verify_modules_parallel(self):
+        interpretation = {'A': ['A'], 'B': ['B'], 'C': ['C']}
+        fcrns = [parse_crn_string(x)[0] for x in ['A + B -> C', 'C -> A']]
+        icrns = [parse_crn_string(x)[0] for x in ['A + B -> i; i -> C', 'C -> j; j -> A']]
+        wrong = [parse_crn_string(x)[0] for x in ['A + B -> i; i -> C', 'C -> j; j -> B']]
+        formals = {'A', 'B', 'C'}
+        for workers in [0, 1, 2]:
+            v, i = verify_modules(fcrns, icrns, formals, 'crn-bisimulation', 
+                                  interpretation = interpretation, workers = workers)
+            assert v is True
+            assert i['j'] == ['C'] or i['j'] == ['A']
+            v, _ = verify_modules(fcrns, wrong, formals, 'crn-bisimulation', 
+                                  interpretation = interpretation, workers = workers)
+            assert v is False
+            with self.assertRaises(NotImplementedError):
+                verify_modules(fcrns, icrns, formals, 'crn-bisimulation', workers = workers)
+
+    def test_verify_isomorphic_modules(self):
+        formals = {'A', 'B', 'C', 'D', 'E', 'F'}
+        interpretation = {x: [x] for x in formals}
+        fcrns = [parse_crn_string(x)[0] for x in ['A + B -> C', 'D + E -> F']]
+        icrns = [parse_crn_string(x)[0] for x in ['A + B -> i; i -> C', 'E + D -> j; j -> F']]
+        wrong = [parse_crn_string(x)[0] for x in ['A + B -> i; i -> C', 'D + E -> j; j -> D']]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = VerificationCache(tmpdir)
+            with self.assertLogs('nuskell.crnverifier', level = 'INFO') as cm:
+                v, i = verify_modules(fcrns, icrns, formals, 'crn-bisimulation', 
+                                      interpretation = interpretation, reuse = True)
+            assert any('1 classes of isomorphic modules' in msg for msg in cm.output)
+            assert v is True
+            assert i['i'] in (['A', 'B'], ['C']) and i['j'] in (['D', 'E'], ['F'])
+            assert (i['i'] == ['C']) == (i['j'] == ['F'])
+            v, _ = verify_modules(fcrns, wrong, formals, 'crn-bisimulation', 
+                                  interpretation = interpretation, reuse = True)
+            assert v is False
+            # The result of the module class is reused by a different system.
+            verify_modules(fcrns[:1], icrns[:1], formals, 'crn-bisimulation',
+                           interpretation = interpretation, cache = cache, reuse = True)
+            assert cache.hits == 0
+            v, i = verify_modules(fcrns[1:], icrns[1:], formals, 'crn-bisimulation', 
+                                  interpretation = interpretation, cache = cache, reuse = True)
+            assert cache.hits == 1
+            assert v is True and i['j'] in (['D', 'E'], ['F'])
+
+    def test_run_with_limits(self):
+        start = time.perf_counter()
+        assert run_with_limits(time.sleep, (30,), timeout = 1) == (None, None)
+        assert time.perf_counter() - start < 10
+        assert run_with_limits(divmod, (7, 2), timeout = 1) == (3, 1)
+        with self.assertRaises(ZeroDivisionError):
+            run_with_limits(divmod, (7, 0), timeout = 1)
+        # Without limits, there is no child process.
+        assert run_with_limits(os.getpid, ()) == os.getpid()
+        with self.assertRaises(VerificationError):
+            run_with_limits(os._exit, (3,), timeout = 10)
+        # The child process cannot allocate 1 GiB with a 512 MiB limit.
+        assert run_with_limits(bytearray, (2**30,), memory = 512) == (None, None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+#
+#  test_dsdanalysis.py
+#  NuskellCompilerProject
+#
+import unittest
+
+from nuskell.objects import clear_memory
+from nuskell.ioutils import load_pil
+from nuskell.dsdcompiler import translate
+from nuskell.dsdanalysis import (complementarity_index,
+                                 polymerization_risk,
+                                 independent_subsystems,
+                                 crosstalk_candidates,
+                                 module_shape)
+
+class DSDAnalysisTests(unittest.TestCase):
+    def tearDown(self):
+        clear_memory()
+
+    def test_complementarity_index(self):
+        cxs, _, _, _ = load_pil("""
+        length t = 5
+        length d = 15
+        A = t d
+        G = d( + ) t*
+        """)
+        index = complementarity_index(cxs)
+        assert index['t'] == [('A', (0, 0))]
+        assert index['t*'] == [('G', (1, 1))]
+        assert index['d'] == [('A', (0, 1))]
+        assert 'd*' not in index
+
+    def test_polymerization_risk(self):
+        cxs, _, _, _ = load_pil("""
+        length a = 5
+        length b = 5
+        length x = 15
+        length y = 15
+        S = a x b
+        G1 = x( + ) a*
+        G2 = x( + ) b*
+        P = a x a*
+        Q1 = a y b
+        Q2 = a* y b*
+        """)
+        # S can bind G1 and G2, but G1 and G2 can only bind one S.
+        assert polymerization_risk({k: cxs[k] for k in ['S', 'G1', 'G2']}) == []
+        # P binds itself.
+        assert polymerization_risk({'P': cxs['P']}) == ['P']
+        # Q1 + Q2 + Q1 + Q2 + ...
+        assert polymerization_risk({k: cxs[k] for k in ['Q1', 'Q2']}) == ['Q1', 'Q2']
+
+    def test_polymerization_risk_schemes(self):
+        solution, _ = translate('A + B -> C + D; C + A -> B', 'soloveichik2010.ts')
+        assert polymerization_risk(solution) == []
+        solution.clear()
+        clear_memory()
+        solution, _ = translate('A <=> 2A; A + B -> 2B; B -> ; A + C -> ; C <=> 2C',
+                                'soloveichik2010.ts')
+        assert len(polymerization_risk(solution)) > 0
+
+    def test_independent_subsystems(self):
+        cxs, _, _, _ = load_pil("""
+        length a = 5
+        length b = 5
+        length c = 5
+        length x = 15
+        A = a x
+        B = x( + ) a*
+        C = b x
+        D = c
+        E = c( + )
+        """)
+        subsystems = independent_subsystems(cxs)
+        assert [sorted(s) for s in subsystems] == [['A', 'B', 'C'], ['D', 'E']]
+        assert all(s[k] is cxs[k] for s in subsystems for k in s)
+
+    def test_crosstalk_candidates(self):
+        cxs, _, _, _ = load_pil("""
+        length a = 5
+        length b = 5
+        length x = 15
+        S = a x b
+        G1 = x( + ) a*
+        G2 = x( + ) b*
+        T = a
+        """)
+        modules = [{k: cxs[k] for k in ['S', 'G1']}, 
+                   {k: cxs[k] for k in ['S', 'G2']}]
+        assert crosstalk_candidates(modules) == []
+        modules.append({'T': cxs['T']})
+        assert crosstalk_candidates(modules) == [('G1', 'T', 'a*')]
+
+    def test_module_shape(self):
+        cxs, _, _, _ = load_pil("""
+        length a = 5
+        length b = 5
+        length c = 7
+        length x = 15
+        length y = 15
+        S = a x
+        G = x( + ) a*
+        T = b y
+        H = y( + ) b*
+        U = c y
+        """)
+        shape, labels = module_shape({k: cxs[k] for k in ['S', 'G']})
+        assert module_shape({k: cxs[k] for k in ['H', 'T']})[0] == shape
+        assert module_shape({k: cxs[k] for k in ['U', 'H']})[0] != shape
+        assert sorted(labels) == ['a', 'x']
+
+if __name__ == '__main__':
+    unittest.main()
+
@@ -3,14 +3,42 @@
 #  test_enumeration.py
 #  NuskellCompilerProject
 #
+import os
+import gc
 import unittest
+import tempfile
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 
-from nuskell.dsdenumerator import (enumerate_solution, 
+from peppercornenumerator import PolymerizationError
+from peppercornenumerator.enumerator import UNI_REACTIONS
+from peppercornenumerator.objects import PepperComplex
+from peppercornenumerator.objects import clear_memory as clear_pepper_memory
+from nuskell.objects import clear_memory
+from nuskell.ioutils import load_pil
+from nuskell.dsdcompiler import translate
+from nuskell.dsdanalysis import crosstalk_candidates
+from nuskell.dsdenumerator import (EnumerationConfig,
+                                   DSDenumerationError,
+                                   EnumerationTimeout,
+                                   enumerate_solution,
                                    enumerate_modules,
+                                   derive_modules,
+                                   enumerate_crosstalk,
+                                   enumerate_sweep,
+                                   enumerate_reactions,
                                    interpret_species)
-                                   
+
+def network(reactions):
+    """ A name-independent representation of an enumerated network. """
+    return sorted((tuple(sorted(x.canonical_form for x in rxn.reactants)),
+                   tuple(sorted(x.canonical_form for x in rxn.products))) for rxn in reactions)
 
 class EnumerationTests(unittest.TestCase):
+    def tearDown(self):
+        clear_memory()
+        clear_pepper_memory()
+
     def todo_test_enumerate_solution(self):
         pass
     def todo_test_enumerat_modules(self):
@@ -18,5 +46,229 @@ class EnumerationTests(unittest.TestCase):
     def todo_test_interpret_species(self):
         pass
 
+    def test_enumeration_config(self):
+        config = EnumerationConfig(ignore_branch_3way = True)
+        assert config.max_complex_size == 10
+        assert len(config.uni_reactions) == len(UNI_REACTIONS) - 1
+        assert config.copy(ignore_branch_3way = False).uni_reactions == UNI_REACTIONS
+        with self.assertRaises(Exception):
+            EnumerationConfig(ignore_branch_5way = True)
+
+    def test_threadsafe_enumerate_solution(self):
+        solution, _ = translate('A + B -> C + D; C -> A', 'soloveichik2010.ts')
+        configs = [EnumerationConfig(),
+                   EnumerationConfig(ignore_branch_3way = True),
+                   EnumerationConfig(enum_detailed = True)]
+
+        sequential = []
+        for config in configs:
+            _, rxns = enumerate_solution(dict(solution), config)
+            sequential.append(network(rxns))
+            del rxns
+        # The global state of peppercorn must remain untouched.
+        assert len(UNI_REACTIONS) == 4
+
+        def job(config):
+            return enumerate_solution(dict(solution), config)
+        with ThreadPoolExecutor(max_workers = 3) as pool:
+            results = list(pool.map(job, configs * 2))
+        for e, (cxs, rxns) in enumerate(results):
+            assert network(rxns) == sequential[e % 3]
+            assert all(cxs[x.name] is x for r in rxns for x in chain(r.reactants, r.products))
+        assert sequential[0] != sequential[1] != sequential[2]
+        assert len(UNI_REACTIONS) == 4
+        results.clear()
+
+    def test_enumerate_independent_of_history(self):
+        solution, _ = translate('A + B -> C + D; C -> A', 'soloveichik2010.ts')
+        prefix = PepperComplex.PREFIX
+        _, rxns = enumerate_solution(dict(solution), EnumerationConfig())
+        assert PepperComplex.PREFIX == prefix
+        condensed = network(rxns)
+        del rxns
+        # Complexes left over from a detailed enumeration of the same system.
+        cxs, rxns = enumerate_solution(dict(solution), EnumerationConfig(enum_detailed = True))
+        _, crxns = enumerate_solution(dict(solution), EnumerationConfig())
+        assert network(crxns) == condensed
+        assert all(cxs[x.name] is x for r in rxns for x in chain(r.reactants, r.products))
+        del cxs, rxns, crxns
+
+    def test_checkpoint_resume(self):
+        crn = 'A + B -> C + D; C + A -> B; D -> A + C'
+        solution, _ = translate(crn, 'soloveichik2010.ts')
+        _, rxns = enumerate_solution(dict(solution), EnumerationConfig())
+        full = network(rxns)
+        del rxns
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ckpt = os.path.join(tmpdir, 'enum.ckpt')
+            config = EnumerationConfig(max_complex_count = 20, 
+                                       checkpoint = ckpt, 
+                                       checkpoint_interval = 0)
+            with self.assertRaises(PolymerizationError):
+                enumerate_solution(dict(solution), config)
+            assert os.path.exists(ckpt)
+            config = config.copy(max_complex_count = 10_000, resume = True)
+            _, rxns = enumerate_solution(dict(solution), config)
+            assert network(rxns) == full
+
+    def test_enumeration_timeout(self):
+        crn = 'A + B -> C + D; C + A -> B; D -> A + C'
+        solution, _ = translate(crn, 'soloveichik2010.ts')
+        _, rxns = enumerate_solution(dict(solution), EnumerationConfig())
+        full = network(rxns)
+        del rxns
+
+        reports = []
+        config = EnumerationConfig(enum_timeout = 1e-6, progress = reports.append)
+        with self.assertRaises(EnumerationTimeout) as cm:
+            enumerate_solution(dict(solution), config)
+        cxs, rxns = cm.exception.complexes, cm.exception.reactions
+        assert len(reports) == 1
+        assert set(reports[0]) == {'complexes', 'reactions', 'queue', 'elapsed'}
+        assert all(cxs[x.name] is x for r in rxns for x in chain(r.reactants, r.products))
+        assert len(network(rxns)) < len(full)
+
+    def test_derive_modules(self):
+        crn = 'A + B -> C + D; C + A -> B; D -> A + C'
+        solution, modules = translate(crn, 'soloveichik2010.ts', modular = True)
+        fsc = [x for x in solution if x in 'ABCD']
+        cxs, rxns = enumerate_solution(dict(solution), EnumerationConfig())
+        interpretation, cxs, rxns = interpret_species(cxs, rxns, fsc)
+        concentrations = {k: v.concentration for k, v in cxs.items()}
+
+        emc, emr = enumerate_modules([dict(m) for m in modules], 
+                                     interpretation, cxs, rxns, EnumerationConfig())
+        # Module enumeration leaves the complexes of the solution untouched.
+        assert {k: v.concentration for k, v in cxs.items()} == concentrations
+        dmc, dmr = derive_modules(modules, interpretation, cxs, rxns)
+        assert len(dmc) == len(dmr) == len(emr)
+        for a, b in zip(emr, dmr):
+            assert network(a) == network(b)
+        assert set(chain(*dmr)) == set(rxns)
+
+    def test_enumerate_isomorphic_modules(self):
+        crn = 'A + B -> C; D + E -> F; C + F -> A; A -> B'
+        solution, modules = translate(crn, 'soloveichik2010.ts', modular = True)
+        fsc = [x for x in solution if x in 'ABCDEF']
+        cxs, rxns = enumerate_solution(dict(solution), EnumerationConfig())
+        interpretation, cxs, rxns = interpret_species(cxs, rxns, fsc)
+
+        with self.assertLogs('nuskell.dsdenumerator', level = 'INFO') as cm:
+            emc, emr = enumerate_modules([dict(m) for m in modules], 
+                                         interpretation, cxs, rxns, EnumerationConfig())
+        assert any('for 2 modules' in msg for msg in cm.output)
+        dmc, dmr = derive_modules(modules, interpretation, cxs, rxns)
+        assert len(emr) == len(dmr)
+        for a, b, c in zip(emc, emr, dmr):
+            assert network(b) == network(c)
+            assert all(a[x.name] is x for r in b for x in chain(r.reactants, r.products))
+
+    def test_enumerate_subsystems(self):
+        solution, _ = translate('A + B -> C; D -> E; F + G -> H', 'soloveichik2010.ts')
+        _, rxns = enumerate_solution(dict(solution), EnumerationConfig())
+        full = network(rxns)
+        del rxns
+        names = []
+        for config in [EnumerationConfig(partition = True), 
+                       EnumerationConfig(partition = True, enum_workers = 2)]:
+            gc.collect()
+            PepperComplex.ID = 1000
+            cxs, rxns = enumerate_solution(dict(solution), config)
+            assert network(rxns) == full
+            assert all(cxs[x.name] is x for r in rxns for x in chain(r.reactants, r.products))
+            # Parallel enumeration does not change the complex names.
+            names.append(sorted((x.name, x.canonical_form) for x in cxs.values()))
+            del cxs, rxns
+        assert names[0] == names[1]
+
+    def test_enumerate_low_memory(self):
+        solution, _ = translate('A + B -> C; D -> E; F + G -> H', 'soloveichik2010.ts')
+        for detailed in [False, True]:
+            config = EnumerationConfig(enum_detailed = detailed)
+            _, rxns = enumerate_solution(dict(solution), config)
+            full = network(rxns)
+            del rxns
+            config = config.copy(enum_low_memory = True)
+            cxs, rxns = enumerate_solution(dict(solution), config)
+            assert network(rxns) == full
+            assert all(cxs[x.name] is x for r in rxns for x in chain(r.reactants, r.products))
+            del cxs, rxns
+
+    def test_enumerate_reactions(self):
+        solution, _ = translate('A + B -> C; D -> E; F + G -> H', 'soloveichik2010.ts')
+        _, rxns = enumerate_solution(dict(solution), EnumerationConfig())
+        full = network(rxns)
+        del rxns
+        cxs = dict(solution)
+        stream = enumerate_reactions(cxs, EnumerationConfig())
+        rxn = next(stream)
+        assert all(x.name in cxs for x in chain(rxn.reactants, rxn.products))
+        rxns = [rxn] + list(stream)
+        assert network(rxns) == full
+        del rxn, rxns
+
+    def test_enumerator_backends(self):
+        def rated(reactions):
+            return sorted((network([r])[0], r.rate_constant[0]) for r in reactions)
+        for crn, ts in [('A + B -> C + D', 'soloveichik2010.ts'),
+                        ('A + B -> C; C -> A', 'qian2011_3D.ts')]:
+            solution, _ = translate(crn, ts)
+            for detailed in [False, True]:
+                config = EnumerationConfig(enum_detailed = detailed)
+                _, rxns = enumerate_solution(dict(solution), config)
+                full = rated(rxns)
+                del rxns
+                config = config.copy(enum_backend = 'screened')
+                _, rxns = enumerate_solution(dict(solution), config)
+                assert rated(rxns) == full
+                del rxns
+            with self.assertRaises(DSDenumerationError):
+                config = EnumerationConfig(enum_backend = 'nupack')
+                enumerate_solution(dict(solution), config)
+            solution.clear()
+            clear_memory()
+
+    def test_enumerate_crosstalk(self):
+        cxs, _, _, _ = load_pil("""
+        length a = 7
+        length x = 15
+        length y = 15
+        length z = 15
+        S = a x
+        G1 = x( + ) a*
+        T = a y
+        G2 = y( + ) a*
+        U = a z
+        """)
+        modules = [{k: cxs[k] for k in ['S', 'G2']}, 
+                   {k: cxs[k] for k in ['T', 'G1']},
+                   {k: cxs[k] for k in ['U']}]
+        candidates = crosstalk_candidates(modules)
+        assert [(x, y) for x, y, _ in candidates] == [
+                ('G1', 'S'), ('G1', 'U'), ('G2', 'T'), ('G2', 'U')]
+        # U binds to G1 and G2, but it cannot displace a strand.
+        crosstalk = enumerate_crosstalk(candidates, cxs, EnumerationConfig())
+        assert sorted(sorted(x.name for x in rxn.reactants) for rxn in crosstalk) == [
+                ['G1', 'S'], ['G2', 'T']]
+
+    def test_enumerate_sweep(self):
+        solution, _ = translate('A + B -> C + D; C + A -> B', 'soloveichik2010.ts')
+        rates = [(0, 0), (1, 0), (10, 0.01)]
+        sweep = enumerate_sweep(solution, EnumerationConfig(), rates)
+        assert [(kf, ks) for kf, ks, _, _ in sweep] == rates
+        for k_fast, k_slow, cxs, crn in sweep:
+            config = EnumerationConfig(k_fast = k_fast, k_slow = k_slow)
+            _, rxns = enumerate_solution(dict(solution), config)
+            assert sorted((tuple(sorted(r.reactants)), tuple(sorted(r.products)), 
+                           round(r.k_fwd, 6)) for r in crn) == \
+                   sorted((tuple(sorted(x.name for x in r.reactants)), 
+                           tuple(sorted(x.name for x in r.products)), 
+                           round(r.rate_constant[0], 6)) for r in rxns)
+            assert all(x in cxs for r in crn for x in chain(r.reactants, r.products))
+            del rxns
+        assert len(sweep[0][3]) != len(sweep[1][3])
+        sweep.clear()
+
 if __name__ == '__main__':
     unittest.main()
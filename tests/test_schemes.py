@@ -54,7 +54,8 @@ def compare_snapshots(cmp_file, new_file, crns, schemes, args = None):
         if args is None:
             args = parse_args(['--max-complex-size', '50',
                                '--max-complex-count', '10000',
-                               '--max-reaction-count', '50000'])
+                               '--max-reaction-count', '50000',
+                               '--no-verify-cache'])
         crns, schemes = process_input(crns, schemes)
         output = compare_schemes(crns, schemes, args)
         dfhead = output[0]